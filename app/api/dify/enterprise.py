@@ -1,8 +1,9 @@
-from datetime import datetime, timedelta
-
 from flask import request
 
 from app.api.router import api
+from app.configs import config
+from app.libs.cache import LRUCache
+from app.libs.static_payload import StaticPayload
 
 # 模拟企业信息
 MOCK_ENTERPRISE_INFO = {
@@ -17,7 +18,7 @@ MOCK_ENTERPRISE_INFO = {
     "is_allow_create_workspace": False,
     "license": {
         "status": "active",
-        "expired_at": (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+        "expired_at": config.LICENSE_EXPIRED_AT
     }
 }
 
@@ -72,7 +73,7 @@ SYSTEM_FEATURES = {
     "is_email_setup": True,
     "license": {
         "status": "active",
-        "expired_at": (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d"),
+        "expired_at": config.LICENSE_EXPIRED_AT,
         "workspaces": {
             "enabled": True,
             "size": 0,
@@ -152,6 +153,15 @@ FEATURES = {
 }
 
 
+# 以上内容在启动时序列化一次，通过 ETag 支持 304
+BILLING_INFO_PAYLOAD = StaticPayload(MOCK_BILLING_INFO)
+SYSTEM_FEATURES_PAYLOAD = StaticPayload(SYSTEM_FEATURES)
+FEATURES_PAYLOAD = StaticPayload(FEATURES)
+
+# app_code -> 应用 SSO 设置；app_code 来自请求参数，容量有上限
+_app_sso_setting_payloads = LRUCache(maxsize=config.APP_SSO_SETTING_CACHE_SIZE)
+
+
 # @api.get("/info")
 # def get_enterprise_info():
 #     return MOCK_ENTERPRISE_INFO
@@ -161,25 +171,29 @@ FEATURES = {
 def get_app_sso_setting():
     app_code = request.args.get("app_code", "")
 
-    return {
-        "enabled": True,
-        "protocol": "oidc",
-        "app_code": app_code
-    }
+    payload = _app_sso_setting_payloads.get(app_code)
+    if payload is None:
+        payload = StaticPayload({
+            "enabled": True,
+            "protocol": "oidc",
+            "app_code": app_code
+        })
+        _app_sso_setting_payloads.set(app_code, payload)
+    return payload.response()
 
 
 # 计费相关接口
 @api.get("/subscription/info")
 def get_billing_info():
-    return MOCK_BILLING_INFO
+    return BILLING_INFO_PAYLOAD.response()
 
 
 # 系统功能
 @api.get("/console/api/system-features")
 def get_system_features():
-    return SYSTEM_FEATURES
+    return SYSTEM_FEATURES_PAYLOAD.response()
 
 
 @api.get("/console/api/features")
 def get_features():
-    return FEATURES
+    return FEATURES_PAYLOAD.response()
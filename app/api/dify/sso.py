@@ -37,8 +37,9 @@ def oidc_callback():
             return redirect(
                 f"{config.CONSOLE_WEB_URL}/webapp-signin?web_sso_token={tokens['access_token']}&redirect_url={redirect_url}")
         else:
+            # bind_account 已记录登录信息，这里不再传入 IP 以免重复写入
             account = oidc_service.bind_account(code, remote_ip)
-            token_pair = AccountService.login(account, remote_ip)
+            token_pair = AccountService.login(account)
 
             response = redirect(f"{config.CONSOLE_WEB_URL}")
 
@@ -1,59 +1,103 @@
+import base64
+import bisect
+import json
 import math
 
-from flask import request, jsonify
+from flask import Response, request, jsonify, stream_with_context
+from sqlalchemy import select
 
 from app.api.router import api, logger
-from app.extensions.ext_redis import redis_client
+from app.configs import config
+from app.libs.static_payload import StaticPayload
 from app.models.account import Account, AccountStatus
 from app.models.engine import db
-from app.models.model import Site
+from app.services.account_directory import AccountDirectory
 from app.services.passport import PassportService
+from app.services.site import SiteService
+from app.services.subject_search import SubjectSearchService
+from app.services.webapp_access import WebAppAccessService
+
+passport_service = PassportService()
+
+# get_app_subjects 每批查询的成员数量
+SUBJECTS_BATCH_SIZE = 1000
+
+ENTERPRISE_INFO_PAYLOAD = StaticPayload({
+    "SSOEnforcedForSignin": True,
+    "SSOEnforcedForSigninProtocol": "oidc",
+    "SSOEnforcedForWebProtocol": "oidc",
+    "EnableEmailCodeLogin": True,
+    "EnableEmailPasswordLogin": True,
+    "IsAllowRegister": True,
+    "IsAllowCreateWorkspace": True,
+    "Branding": {
+        "applicationTitle": "",
+        "loginPageLogo": "",
+        "workspaceLogo": "",
+        "favicon": "",
+    },
+    "WebAppAuth": {
+        "allowSso": True,
+        "allowEmailCodeLogin": True,
+        "allowEmailPasswordLogin": True,
+    },
+    "License": {
+        "status": "active",
+        "workspaces": {
+            "enabled": True,
+            "used": 1,
+            "limit": 100
+        },
+        "expiredAt": f"{config.LICENSE_EXPIRED_AT}T23:59:59Z",
+    },
+    "PluginInstallationPermission": {
+        "pluginInstallationScope": "all",
+        "restrictToMarketplaceOnly": True
+    }
+})
 
 
 @api.get("/info")
 def get_enterprise_info():
-    logger.info("get_enterprise_info called")
-    data = {
-        "SSOEnforcedForSignin": True,
-        "SSOEnforcedForSigninProtocol": "oidc",
-        "SSOEnforcedForWebProtocol": "oidc",
-        "EnableEmailCodeLogin": True,
-        "EnableEmailPasswordLogin": True,
-        "IsAllowRegister": True,
-        "IsAllowCreateWorkspace": True,
-        "Branding": {
-            "applicationTitle": "",
-            "loginPageLogo": "",
-            "workspaceLogo": "",
-            "favicon": "",
-        },
-        "WebAppAuth": {
-            "allowSso": True,
-            "allowEmailCodeLogin": True,
-            "allowEmailPasswordLogin": True,
-        },
-        "License": {
-            "status": "active",
-            "workspaces": {
-                "enabled": True,
-                "used": 1,
-                "limit": 100
-            },
-            "expiredAt": "2099-12-31T23:59:59Z",
-        },
-        "PluginInstallationPermission": {
-            "pluginInstallationScope": "all",
-            "restrictToMarketplaceOnly": True
-        }
-    }
+    logger.debug("get_enterprise_info called")
+    return ENTERPRISE_INFO_PAYLOAD.response()
 
-    return data
+
+# 从未修改过访问控制时返回的时间
+INITIAL_UPDATE_TIME = "2025-01-01T00:00:00+00:00"
 
 
 @api.get("/sso/app/last-update-time")
 @api.get("/sso/workspace/last-update-time")
 def get_sso_app_last_update_time():
-    return jsonify("2025-01-01T00:00:00+00:00")
+    app_id = request.args.get("appId", "")
+    if app_id:
+        version, updated_at = WebAppAccessService.get_app_last_change(app_id)
+    else:
+        version, updated_at = WebAppAccessService.get_last_change()
+    response = jsonify(updated_at or INITIAL_UPDATE_TIME)
+    response.headers["X-Access-Policy-Version"] = str(version)
+    return response
+
+
+@api.get("/webapp/access-mode/changes")
+def get_webapp_access_mode_changes():
+    try:
+        since = int(request.args.get("since", 0))
+        limit = min(1000, max(1, int(request.args.get("limit", 1000))))
+    except ValueError:
+        return {
+            "error": "Invalid parameter format",
+            "message": "since and limit must be valid integers"
+        }, 400
+    logger.debug("get_webapp_access_mode_changes: since=%s, limit=%s", since, limit)
+
+    version, changes = WebAppAccessService.get_changes_since(since, limit)
+    return {
+        "version": version,
+        "changes": [{"appId": app_id, "version": app_version} for app_id, app_version in changes],
+        "hasMore": len(changes) == limit and changes[-1][1] < version,
+    }
 
 
 @api.post("/webapp/access-mode")
@@ -62,7 +106,9 @@ def set_app_access_mode():
     appId = request.json.get("appId", "")
     access_mode = request.json.get("accessMode", "")
     subjects = request.json.get("subjects", [])
-    logger.info(f"set_app_access_mode called with appId: {appId}, accessMode: {access_mode}, subjects: {subjects}")
+    logger.info(
+        "set_app_access_mode called with appId: %s, accessMode: %s, subjects: %d", appId, access_mode, len(subjects)
+    )
 
     if appId == "":
         return {"accessMode": "public", "result": False}
@@ -77,9 +123,7 @@ def set_app_access_mode():
         elif subject_type == "group":
             groups.append(subject_id)
 
-    redis_client.set(f"webapp_access_mode:{appId}", access_mode)
-    redis_client.set(f"webapp_access_mode:accounts:{appId}", ",".join(accounts))
-    redis_client.set(f"webapp_access_mode:groups:{appId}", ",".join(groups))
+    WebAppAccessService.set_access_mode(appId, access_mode, accounts, groups)
 
     return {"accessMode": access_mode, "result": True}
 
@@ -90,37 +134,27 @@ def set_app_access_mode():
 def get_app_access_mode():
     app_id = request.args.get("appId", "")
     app_code = request.args.get("appCode", "")
-    logger.info(f"get_app_access_mode: app_id={app_id}, app_code={app_code}")
+    logger.debug("get_app_access_mode: app_id=%s, app_code=%s", app_id, app_code)
 
     if app_code != "":
-        site = db.session.query(Site).filter(Site.code == app_code).first()
-        if site:
-            app_id = site.app_id
+        app_id = SiteService.get_app_id_by_code(app_code) or app_id
     if app_id == "":
-        logger.info(f"app_id is empty, return public")
+        logger.debug("app_id is empty, return public")
         return {"accessMode": "public"}
-    else:
-        access_mode = redis_client.get(f"webapp_access_mode:{app_id}")
-        if access_mode:
-            logger.info(f"app_id:{app_id}, access_mode: {access_mode.decode()}")
-            return {"accessMode": access_mode.decode()}
-        else:
-            logger.info(f"app_id:{app_id}, access_mode not set, return public")
-            return {"accessMode": "public"}
+
+    access_mode = WebAppAccessService.get_access_mode(app_id)
+    logger.debug("app_id:%s, access_mode: %s", app_id, access_mode)
+    return {"accessMode": access_mode}
 
 
 @api.post("/webapp/access-mode/batch/id")
 def get_webapp_access_mode_code_batch():
     appIds = request.json.get("appIds", [])
     accessModes = {}
-    logger.info(f"get_webapp_access_mode_code_batch: appIds={appIds}")
+    logger.debug("get_webapp_access_mode_code_batch: appIds=%s", appIds)
 
-    for app_id in appIds:
-        access_mode = redis_client.get(f"webapp_access_mode:{app_id}")
-        if access_mode:
-            accessModes[app_id] = access_mode.decode()
-        else:
-            accessModes[app_id] = "public"
+    if appIds:
+        accessModes = WebAppAccessService.get_access_modes(appIds)
 
     return {"accessModes": accessModes}
 
@@ -131,14 +165,12 @@ def get_app_permission():
     user_id = "visitor"
     app_id = request.args.get("appId", "")
     app_code = request.args.get("appCode", "")
-    logger.info(f"get_app_permission: app_id={app_id}, app_code={app_code}")
+    logger.debug("get_app_permission: app_id=%s, app_code=%s", app_id, app_code)
 
     if app_code != "":
-        site = db.session.query(Site).filter(Site.code == app_code).first()
-        if site:
-            app_id = site.app_id
-        else:
-            logger.info(f"app_code {app_code} not found")
+        app_id = SiteService.get_app_id_by_code(app_code)
+        if app_id is None:
+            logger.debug("app_code %s not found", app_code)
             return {"result": False}
 
     try:
@@ -153,66 +185,95 @@ def get_app_permission():
         if auth_scheme != "bearer":
             raise
 
-        decoded = PassportService().verify(tk)
-        logger.info(f"app_id {app_id} decoded token: {decoded}")
+        decoded = passport_service.verify(tk)
         user_id = decoded.get("end_user_id", decoded.get("user_id", "visitor"))
+        logger.debug("app_id %s token user: %s", app_id, user_id)
     except Exception as e:
-        logger.error(f"get_app_permission error: {e}")
+        logger.debug("get_app_permission falls back to visitor: %s", e)
         pass
 
-    access_mode = "public"
-    access_mode_value = redis_client.get(f"webapp_access_mode:{app_id}")
-    if access_mode_value is not None:
-        access_mode = access_mode_value.decode()
-
-    if access_mode == "public":
-        logger.info(f"app_id {app_id} is public, access granted")
-        return {"result": True}
-
-    if access_mode in ["private_all", "sso_verified"] and user_id != "visitor":
-        logger.info(f"app_id {app_id} is private_all or sso_verified, user_id {user_id} is not visitor, access granted")
-        return {"result": True}
-    else:
-        accounts_value = redis_client.get(f"webapp_access_mode:accounts:{app_id}")
-        if accounts_value:
-            accounts = accounts_value.decode().split(",")
-            if user_id in accounts:
-                logger.info(f"app_id {app_id} has accounts set, user_id {user_id} is in accounts, access granted")
-                return {"result": True}
-            else:
-                logger.info(f"app_id {app_id} has accounts set, user_id {user_id} is not in accounts, access denied")
-                return {"result": False}
-        else:
-            logger.info(f"app_id {app_id} has no accounts set, access denied")
-            return {"result": False}
+    result = WebAppAccessService.check_permission(app_id, user_id, require_login=True)
+    logger.debug("app_id %s, user_id %s, access %s", app_id, user_id, 'granted' if result else 'denied')
+    return {"result": result}
 
 
 @api.get("/console/api/enterprise/webapp/app/subjects")
 def get_app_subjects():
     app_id = request.args.get("appId", "")
-    logger.info(f"get_app_subjects: app_id={app_id}")
+    logger.debug("get_app_subjects: app_id=%s", app_id)
 
     if app_id == "":
         return {"groups": [], "members": []}
 
-    accounts_value = redis_client.get(f"webapp_access_mode:accounts:{app_id}")
-    if accounts_value:
-        accounts = accounts_value.decode().split(",")
-        users = db.session.query(Account).filter(Account.status == AccountStatus.ACTIVE, Account.id.in_(accounts)).all()
-    else:
-        users = []
+    groups = [_group_data(group) for group in WebAppAccessService.get_groups(app_id)]
+
+    # 成员可能多达数万，分批查询并流式输出，内存占用与成员数量无关
+    def generate():
+        yield '{"groups": ' + json.dumps(groups) + ', "members": ['
+        first = True
+        for batch in WebAppAccessService.iter_account_batches(app_id, SUBJECTS_BATCH_SIZE):
+            if AccountDirectory.ready():
+                users = AccountDirectory.get_many(batch)
+            else:
+                users = db.session.execute(
+                    select(Account.id, Account.name, Account.email, Account.avatar)
+                    .where(Account.status == AccountStatus.ACTIVE, Account.id.in_(batch))
+                ).all()
+            members = [
+                json.dumps({
+                    "id": str(user.id),
+                    "name": user.name or "",
+                    "email": user.email or "",
+                    "avatar": user.avatar or "",
+                    "avatarUrl": ""
+                })
+                for user in users
+            ]
+            if members:
+                # 每批输出一个分块
+                yield ("" if first else ",") + ",".join(members)
+                first = False
+        yield "]}"
 
-    members = []
-    for user in users:
-        members.append({
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def _group_data(group: str) -> dict:
+    # 组来自 IdP 的 claim，名称即 id；没有组到成员的索引，因此不返回组的人数
+    return {"id": group, "name": group}
+
+
+def _group_subject(group: str) -> dict:
+    return {"subjectId": group, "subjectType": "group", "groupData": _group_data(group)}
+
+
+def _account_subject(user) -> dict:
+    return {
+        "subjectId": str(user.id),
+        "subjectType": "account",
+        "accountData": {
             "id": str(user.id),
             "name": user.name or "",
             "email": user.email or "",
             "avatar": user.avatar or "",
             "avatarUrl": ""
-        })
+        }
+    }
 
-    return {"groups": [], "members": members}
+
+# 组的游标带有前缀，账号游标是 urlsafe base64，不会包含 "."
+GROUP_CURSOR_PREFIX = "g."
+
+
+def _encode_group_cursor(group: str) -> str:
+    return GROUP_CURSOR_PREFIX + base64.urlsafe_b64encode(group.encode()).decode()
+
+
+def _decode_group_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor[len(GROUP_CURSOR_PREFIX):].encode()).decode()
+    except Exception:
+        raise ValueError("invalid cursor")
 
 
 @api.get("/console/api/enterprise/webapp/app/subject/search")
@@ -222,61 +283,31 @@ def search_app_subjects():
         page = max(1, int(request.args.get("pageNumber", 1)))
         page_size = min(100, max(1, int(request.args.get("resultsPerPage", 10))))  # 限制页面大小
         keyword = request.args.get("keyword", "").strip()
-        logger.info(f"search_app_subjects: page={page}, page_size={page_size}, keyword={keyword}")
-
-        # 构建基础查询条件
-        base_query = db.session.query(Account).filter(Account.status == AccountStatus.ACTIVE)
-
-        # 添加搜索条件 - 支持姓名和邮箱搜索
-        if keyword:
-            search_filter = db.or_(
-                Account.name.ilike(f"%{keyword}%"),
-                Account.email.ilike(f"%{keyword}%")
-            )
-            base_query = base_query.filter(search_filter)
-
-        # 计算总数和分页数据（使用窗口函数优化）
-        paginated_query = base_query.order_by(Account.name, Account.id)  # 确保排序稳定性
-
-        # 获取总数
-        total_count = base_query.count()
-
-        if total_count == 0:
-            return {
-                "currPage": page,
-                "totalPages": 0,
-                "subjects": [],
-                "hasMore": False,
-            }
-
-        # 分页查询
+        # 传入 cursor 参数（首页为空字符串）时使用游标分页
+        cursor = request.args.get("cursor")
+        logger.debug(
+            "search_app_subjects: page=%s, page_size=%s, keyword=%s, cursor=%s", page, page_size, keyword, cursor
+        )
+
+        if cursor is not None:
+            return _search_subjects_after(keyword, cursor, page, page_size)
+
+        # 匹配的组排在账号之前，与账号一起计入每页数量和总页数
+        groups = WebAppAccessService.search_groups(keyword)
         offset = (page - 1) * page_size
-        users = paginated_query.limit(page_size).offset(offset).all()
-
-        # 构建响应数据
-        subjects = [
-            {
-                "subjectId": str(user.id),
-                "subjectType": "account",
-                "accountData": {
-                    "id": str(user.id),
-                    "name": user.name or "",
-                    "email": user.email or "",
-                    "avatar": user.avatar or "",
-                    "avatarUrl": ""
-                }
-            }
-            for user in users
-        ]
+        page_groups = groups[offset:offset + page_size]
+        account_total, users = SubjectSearchService.search(
+            keyword, max(0, offset - len(groups)), page_size - len(page_groups)
+        )
 
         # 计算分页信息
-        total_pages = math.ceil(total_count / page_size)
+        total_pages = math.ceil((len(groups) + account_total) / page_size)
         has_more = page < total_pages
 
         return {
             "currPage": page,
             "totalPages": total_pages,
-            "subjects": subjects,
+            "subjects": [_group_subject(group) for group in page_groups] + [_account_subject(user) for user in users],
             "hasMore": has_more,
         }
 
@@ -284,7 +315,7 @@ def search_app_subjects():
         # 参数类型错误
         return {
             "error": "Invalid parameter format",
-            "message": "pageNumber and resultsPerPage must be valid integers"
+            "message": "pageNumber and resultsPerPage must be valid integers and cursor must be a valid cursor"
         }, 400
     except Exception as e:
         # 其他异常
@@ -294,30 +325,59 @@ def search_app_subjects():
         }, 500
 
 
+def _search_subjects_after(keyword: str, cursor: str, page: int, page_size: int) -> dict:
+    """
+    returns one page of cursor pagination: the matching groups first, then the accounts.
+
+    While groups remain the cursor points into the group list, afterwards it is an
+    account cursor from SubjectSearchService. The total is only returned on the first page.
+    """
+    if cursor and not cursor.startswith(GROUP_CURSOR_PREFIX):
+        users, next_cursor, _ = SubjectSearchService.search_after(keyword, cursor, page_size)
+        subjects = [_account_subject(user) for user in users]
+        return {"currPage": page, "subjects": subjects, "hasMore": next_cursor is not None, "nextCursor": next_cursor}
+
+    groups = WebAppAccessService.search_groups(keyword)
+    start = bisect.bisect_right(groups, _decode_group_cursor(cursor)) if cursor else 0
+    page_groups = groups[start:start + page_size]
+    subjects = [_group_subject(group) for group in page_groups]
+    remaining = page_size - len(page_groups)
+    if remaining:
+        users, next_cursor, account_total = SubjectSearchService.search_after(keyword, None, remaining)
+        subjects += [_account_subject(user) for user in users]
+        has_more = next_cursor is not None
+    else:
+        # 本页已被组占满，下一页从最后一个组之后继续
+        account_total, probe = SubjectSearchService.search(keyword, 0, 1)
+        has_more = start + page_size < len(groups) or bool(probe)
+        next_cursor = _encode_group_cursor(page_groups[-1]) if has_more else None
+
+    response = {"currPage": page, "subjects": subjects, "hasMore": has_more, "nextCursor": next_cursor}
+    if not cursor:
+        # 总数仅在游标分页的首页返回
+        response["totalPages"] = math.ceil((len(groups) + account_total) / page_size)
+    return response
+
+
 @api.get("/webapp/access-mode/code")
 def get_webapp_access_mode_code():
-    logger.info("get_webapp_access_mode_code called", request.args)
     app_code = request.args.get("app_code", "")
     if app_code == "":
         app_code = request.args.get("appCode", "")
 
-    logger.info(f"get_webapp_access_mode_code: app_code={app_code}")
+    logger.debug("get_webapp_access_mode_code: app_code=%s", app_code)
 
     if app_code == "":
-        logger.info(f"app_code is empty, return public")
+        logger.debug("app_code is empty, return public")
         return {"accessMode": "public"}
 
-    site = db.session.query(Site).filter(Site.code == app_code).first()
-    if site:
-        access_mode_value = redis_client.get(f"webapp_access_mode:{site.app_id}")
-        if access_mode_value:
-            logger.info(f"app_code:{app_code}, access_mode: {access_mode_value.decode()}")
-            return {"accessMode": access_mode_value.decode()}
-        else:
-            logger.info(f"app_code:{app_code}, access_mode not set, return public")
-            return {"accessMode": "public"}
+    app_id = SiteService.get_app_id_by_code(app_code)
+    if app_id:
+        access_mode = WebAppAccessService.get_access_mode(app_id)
+        logger.debug("app_code:%s, access_mode: %s", app_code, access_mode)
+        return {"accessMode": access_mode}
     else:
-        logger.info(f"app_code {app_code} not found, return public")
+        logger.debug("app_code %s not found, return public", app_code)
         return {"accessMode": "public"}
 
 
@@ -326,41 +386,17 @@ def get_webapp_permission():
     app_code = request.args.get("appCode", "")
     user_id = request.args.get("userId", "")
     app_id = request.args.get("appId", "")
-    logger.info(f"get_webapp_permission: app_code={app_code}, user_id={user_id}")
+    logger.debug("get_webapp_permission: app_code=%s, user_id=%s", app_code, user_id)
 
     if app_code != "":
-        site = db.session.query(Site).filter(Site.code == app_code).first()
-        if site:
-            app_id = site.app_id
-        else:
-            logger.info(f"app_code {app_code} not found")
+        app_id = SiteService.get_app_id_by_code(app_code)
+        if app_id is None:
+            logger.debug("app_code %s not found", app_code)
             return {"result": False}
 
-    access_mode = "public"
-    access_mode_value = redis_client.get(f"webapp_access_mode:{app_id}")
-    if access_mode_value is not None:
-        access_mode = access_mode_value.decode()
-
-    if access_mode == "public":
-        logger.info(f"app_id {app_id} is public, access granted")
-        return {"result": True}
-
-    if access_mode in ["private_all", "sso_verified"]:
-        logger.info(f"app_id {app_id} is private_all or sso_verified, access granted")
-        return {"result": True}
-    else:
-        accounts_value = redis_client.get(f"webapp_access_mode:accounts:{app_id}")
-        if accounts_value:
-            accounts = accounts_value.decode().split(",")
-            if user_id in accounts:
-                logger.info(f"app_id {app_id} has accounts set, user_id {user_id} is in accounts, access granted")
-                return {"result": True}
-            else:
-                logger.info(f"app_id {app_id} has accounts set, user_id {user_id} is not in accounts, access denied")
-                return {"result": False}
-        else:
-            logger.info(f"app_id {app_id} has no accounts set, access denied")
-            return {"result": False}
+    result = WebAppAccessService.check_permission(app_id, user_id)
+    logger.debug("app_id %s, user_id %s, access %s", app_id, user_id, 'granted' if result else 'denied')
+    return {"result": result}
 
 
 @api.post("/webapp/permission/batch")
@@ -368,38 +404,16 @@ def get_webapp_permission_batch():
     appCodes = request.json.get("appCodes", [])
     userId = request.json.get("userId", "")
     permissions = {}
-    logger.info(f"get_webapp_permission_batch: appCodes={appCodes}, userId={userId}")
+    logger.debug("get_webapp_permission_batch: appCodes=%s, userId=%s", appCodes, userId)
 
+    if not appCodes:
+        return {"permissions": permissions}
+
+    app_ids = SiteService.get_app_ids_by_codes(appCodes)
+    results = WebAppAccessService.check_permissions([app_id for app_id in app_ids.values() if app_id], userId)
     for app_code in appCodes:
-        permissions[app_code] = False
-        site = db.session.query(Site).filter(Site.code == app_code).first()
-        if site:
-            app_id = site.app_id
-        else:
-            continue
-
-        access_mode = "public"
-        access_mode_value = redis_client.get(f"webapp_access_mode:{app_id}")
-        if access_mode_value is not None:
-            access_mode = access_mode_value.decode()
-
-        if access_mode == "public":
-            permissions[app_code] = True
-            continue
-
-        if access_mode in ["private_all", "sso_verified"]:
-            permissions[app_code] = True
-            continue
-        else:
-            accounts_value = redis_client.get(f"webapp_access_mode:accounts:{app_id}")
-            if accounts_value:
-                accounts = accounts_value.decode().split(",")
-                if userId in accounts:
-                    permissions[app_code] = True
-                else:
-                    permissions[app_code] = False
-            else:
-                permissions[app_code] = False
+        app_id = app_ids[app_code]
+        permissions[app_code] = app_id is not None and results[app_id]
 
     return {"permissions": permissions}
 
@@ -407,14 +421,12 @@ def get_webapp_permission_batch():
 @api.delete("/webapp/clean")
 def clean_webapp_access_mode():
     appId = request.args.get("appId", "")
-    logger.info(f"clean_webapp_access_mode called with appId: {appId}")
+    logger.info("clean_webapp_access_mode called with appId: %s", appId)
 
     if appId == "":
         return {"result": False}
-    logger.info(f"clean_webapp_access_mode: {appId}")
-    redis_client.delete(f"webapp_access_mode:{appId}")
-    redis_client.delete(f"webapp_access_mode:groups:{appId}")
-    redis_client.delete(f"webapp_access_mode:accounts:{appId}")
+    logger.info("clean_webapp_access_mode: %s", appId)
+    WebAppAccessService.clean_access_mode(appId)
 
     return {"result": True}
 
@@ -425,6 +437,6 @@ def check_credential_policy_compliance():
     # 示例请求体
     # {'dify_credential_id': '0198eabb-3b2c-793e-a491-3ddf5bfc75a6', 'provider': 'langgenius/tongyi/tongyi', 'credential_type': 0}
     data = request.json
-    logger.info(f"check_credential_policy_compliance called with data: {data}")
+    logger.info("check_credential_policy_compliance called with data: %s", data)
 
     return {"result": True}
@@ -1,10 +1,17 @@
 import logging
 
-from flask import Blueprint, jsonify, request
-from sqlalchemy import text
-
-from app.extensions.ext_redis import redis_client
-from app.models import db
+from flask import Blueprint, Response, jsonify, request
+
+from app.configs import config
+from app.libs import metrics
+from app.libs.log_pipeline import DroppingQueueHandler
+from app.services.account import AccountService
+from app.services.account_directory import AccountDirectory
+from app.services.health import HealthProber
+from app.services.login_info import LoginInfoWriter
+from app.services.passport import PassportService
+from app.services.site import SiteService
+from app.services.webapp_access import WebAppAccessService
 
 logger = logging.getLogger(__name__)
 
@@ -20,24 +27,22 @@ def index():
 def health_check():
     detail = request.args.get("detail", False)
     if detail:
-        try:
-            db.session.execute(text("SELECT 1")).fetchone()
-            database_status = True
-        except Exception as e:
-            logger.exception("Database connection failed: %s", str(e))
-            database_status = False
-
-        try:
-            redis_client.ping()
-            redis_status = True
-        except Exception as e:
-            logger.exception("Redis connection failed: %s", str(e))
-            redis_status = False
-
+        # 依赖状态由后台线程定期探测，这里只读取缓存的结果
+        healthy, checks = HealthProber.report()
         health_status = {
-            "status": "healthy" if database_status and redis_status else "unhealthy",
-            "database": database_status,
-            "redis": redis_status
+            "status": "healthy" if healthy else "unhealthy",
+            "database": checks["database"]["ok"],
+            "redis": checks["redis"]["ok"],
+            "checks": checks,
+            "caches": {
+                "site_code": SiteService.cache_stats(),
+                "access_policy": WebAppAccessService.cache_stats(),
+                "passport": PassportService.cache_stats(),
+                "account_login": AccountService.login_cache_stats(),
+                "account_directory": AccountDirectory.stats(),
+            },
+            "logging": {"dropped": DroppingQueueHandler.dropped},
+            "login_info": LoginInfoWriter.stats(),
         }
     else:
         health_status = {
@@ -47,6 +52,14 @@ def health_check():
     return health_status
 
 
+@api.get("/metrics")
+def get_metrics():
+    if not config.METRICS_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
 # 处理错误
 @api.errorhandler(404)
 def not_found_error(error):
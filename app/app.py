@@ -13,15 +13,21 @@ def create_app(name: str) -> Flask:
     app.config.from_mapping(config.model_dump())
     app.uptime = time.time()
 
-    initialize_extensions(app)
-
-    end_time = time.perf_counter()
-    if config.DEBUG:
-        logging.info("Finished create_app (%s ms)", round((end_time - start_time) * 1000, 2))
+    timings = initialize_extensions(app)
+    # 预加载时后台线程不能跨越 fork，由 gunicorn 在每个 worker 中启动
+    if not config.DEFER_BACKGROUND_TASKS:
+        start_background_tasks(app)
 
     # 启动前检查
     check_app_config(app)
 
+    end_time = time.perf_counter()
+    logging.info(
+        "Finished create_app (%s ms): %s",
+        round((end_time - start_time) * 1000, 2),
+        ", ".join(f"{name} {duration} ms" for name, duration in timings.items()),
+    )
+
     return app
 
 
@@ -30,15 +36,72 @@ def check_app_config(app: Flask):
         raise Exception("OIDC配置不完整，请检查配置文件!")
 
 
-def initialize_extensions(app: Flask):
-    from app.extensions import ext_database, ext_redis, ext_logging, ext_timezone, ext_blueprints, ext_oidc
+def get_extensions() -> list:
+    from app.extensions import (
+        ext_database,
+        ext_redis,
+        ext_logging,
+        ext_metrics,
+        ext_request_timing,
+        ext_timezone,
+        ext_blueprints,
+        ext_oidc,
+        ext_webapp_access,
+        ext_login_info,
+        ext_subject_search,
+        ext_health,
+        ext_commands,
+    )
+
+    return [
+        ext_database,
+        ext_redis,
+        ext_logging,
+        ext_metrics,
+        ext_request_timing,
+        ext_timezone,
+        ext_blueprints,
+        ext_oidc,
+        ext_webapp_access,
+        ext_login_info,
+        ext_subject_search,
+        ext_health,
+        ext_commands,
+    ]
 
-    extensions = [ext_database, ext_redis, ext_logging, ext_timezone, ext_blueprints, ext_oidc]
 
-    for ext in extensions:
+def initialize_extensions(app: Flask) -> dict[str, float]:
+    """initializes the extensions in order and returns each one's duration in ms"""
+    timings: dict[str, float] = {}
+    for ext in get_extensions():
         short_name = ext.__name__.split(".")[-1]
         start_time = time.perf_counter()
         ext.init_app(app)
-        end_time = time.perf_counter()
-        if config.DEBUG:
-            logging.info("Loaded %s (%s ms)", short_name, round((end_time - start_time) * 1000, 2))
+        timings[short_name] = round((time.perf_counter() - start_time) * 1000, 2)
+    return timings
+
+
+def start_background_tasks(app: Flask):
+    """starts the extensions' background threads, in each worker when the app is preloaded"""
+    for ext in get_extensions():
+        if hasattr(ext, "start"):
+            ext.start(app)
+
+
+def reinitialize_after_fork(app: Flask):
+    """
+    called in each worker forked from a preloaded master, before it serves requests:
+    drops connections, locks and threads inherited from the master.
+    """
+    for ext in get_extensions():
+        if hasattr(ext, "after_fork"):
+            ext.after_fork(app)
+
+    from app.services.account import AccountService
+    from app.services.passport import PassportService
+    from app.services.site import SiteService
+
+    # 不属于任何扩展的进程内缓存
+    SiteService.after_fork()
+    PassportService.after_fork()
+    AccountService.after_fork()
@@ -0,0 +1,47 @@
+import click
+
+from app.services.subject_search import SubjectSearchService
+from app.services.webapp_access import WebAppAccessService
+
+
+@click.command("migrate-webapp-access-mode", help="Migrate webapp access modes to the hash + set layout.")
+@click.option("--keep-legacy", is_flag=True, default=False, help="Keep the legacy string keys after migration.")
+def migrate_webapp_access_mode(keep_legacy: bool):
+    """
+    Converts the legacy `webapp_access_mode:*` string keys in place.
+
+    Safe to run while the service is serving: readers fall back to the legacy keys until an
+    app is converted, and apps written in the new layout in the meantime are left untouched.
+    """
+    click.echo(click.style("Start migrating webapp access modes.", fg="green"))
+    migrated = skipped = failed = 0
+    for app_id in WebAppAccessService.iter_legacy_app_ids():
+        try:
+            if WebAppAccessService.migrate_legacy_policy(app_id, keep_legacy=keep_legacy):
+                migrated += 1
+            else:
+                skipped += 1
+        except Exception as e:
+            failed += 1
+            click.echo(click.style(f"Failed to migrate app {app_id}: {e}", fg="red"))
+
+    click.echo(
+        click.style(f"Migration finished: {migrated} migrated, {skipped} skipped, {failed} failed.", fg="green")
+    )
+
+
+@click.command("create-subject-search-index", help="Create the pg_trgm indexes used by subject search.")
+def create_subject_search_index():
+    """
+    Creates the pg_trgm extension and GIN indexes on accounts.name / accounts.email.
+
+    Indexes are built CONCURRENTLY, so the command can run against a live database.
+    Postgres uses them for subject search as soon as they are built, no restart needed.
+    """
+    click.echo(click.style("Start creating subject search indexes.", fg="green"))
+    try:
+        SubjectSearchService.create_indexes()
+    except Exception as e:
+        click.echo(click.style(f"Failed to create subject search indexes: {e}", fg="red"))
+        return
+    click.echo(click.style("Subject search indexes created.", fg="green"))
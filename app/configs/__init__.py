@@ -5,6 +5,7 @@ from .database_config import DatabaseConfig
 from .logger_config import LoggingConfig
 from .redis_config import RedisConfig
 from .sso_config import SSOConfig
+from .webapp_config import WebAppConfig
 
 
 class Config(
@@ -13,6 +14,7 @@ class Config(
     RedisConfig,
     LoggingConfig,
     SSOConfig,
+    WebAppConfig,
 ):
     model_config = SettingsConfigDict(
         # read from dotenv format config file
@@ -1,4 +1,4 @@
-from pydantic import Field, PositiveInt
+from pydantic import Field, NonNegativeInt, PositiveFloat, PositiveInt
 from pydantic_settings import BaseSettings
 
 
@@ -54,3 +54,84 @@ class AppConfig(BaseSettings):
         description="Prefix for account refresh tokens",
         default="account_refresh_token:",
     )
+
+    DEFER_BACKGROUND_TASKS: bool = Field(
+        description="Do not start background threads in create_app, set by gunicorn.conf.py when the app is "
+                    "preloaded in the master so that each worker starts its own after fork",
+        default=False,
+    )
+
+    METRICS_ENABLED: bool = Field(
+        description="Expose Prometheus metrics on /metrics and record request, Redis, database and IdP timings",
+        default=True,
+    )
+
+    REQUEST_TIMING_ENABLED: bool = Field(
+        description="Record the time each request spends in the database, Redis, the IdP and JWT work, "
+                    "and return it in a Server-Timing header",
+        default=False,
+    )
+
+    REQUEST_TIMING_LOG_THRESHOLD: NonNegativeInt = Field(
+        description="Log the I/O timeline of requests slower than this many milliseconds, "
+                    "only used when REQUEST_TIMING_ENABLED is true",
+        default=500,
+    )
+
+    HEALTH_CHECK_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds between background probes of the database, Redis and the IdP",
+        default=10,
+    )
+
+    HEALTH_CHECK_TIMEOUT: PositiveFloat = Field(
+        description="Timeout in seconds for each background health probe",
+        default=3.0,
+    )
+
+    LICENSE_EXPIRED_AT: str = Field(
+        description="License expiry date reported to Dify, in YYYY-MM-DD format",
+        default="2099-12-31",
+    )
+
+    STATIC_PAYLOAD_MAX_AGE: NonNegativeInt = Field(
+        description="max-age in seconds sent with the static feature and info payloads, "
+                    "clients revalidate with If-None-Match afterwards",
+        default=60,
+    )
+
+    APP_SSO_SETTING_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of per-app SSO setting payloads kept serialized in each worker",
+        default=10000,
+    )
+
+    LOGIN_INFO_FLUSH_INTERVAL: NonNegativeInt = Field(
+        description="Seconds between batched writes of last-login info, 0 writes it synchronously on every login",
+        default=5,
+    )
+
+    LOGIN_INFO_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of accounts with pending last-login info, further logins are not recorded "
+                    "until the next flush",
+        default=10000,
+    )
+
+    LOGIN_INFO_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of accounts updated by one multi-row UPDATE",
+        default=500,
+    )
+
+    ACCOUNT_LOGIN_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of emails whose account id, name, status and role are cached for repeat logins",
+        default=10000,
+    )
+
+    ACCOUNT_LOGIN_CACHE_TTL: NonNegativeInt = Field(
+        description="TTL in seconds for cached login account info, 0 disables the cache",
+        default=300,
+    )
+
+    PASSPORT_CACHE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of verified passport tokens whose claims are cached until they expire, "
+                    "0 disables the cache",
+        default=10000,
+    )
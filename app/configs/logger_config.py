@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import Field, PositiveInt
+from pydantic import Field, NonNegativeInt, PositiveInt
 from pydantic_settings import BaseSettings
 
 
@@ -43,3 +43,29 @@ class LoggingConfig(BaseSettings):
         description="Timezone for log timestamps (e.g., 'America/New_York')",
         default="UTC",
     )
+
+    LOG_JSON: bool = Field(
+        description="Write logs as one JSON object per line instead of LOG_FORMAT",
+        default=False,
+    )
+
+    LOG_QUEUE_ENABLED: bool = Field(
+        description="Hand log records to a background thread so request threads never block on log I/O",
+        default=True,
+    )
+
+    LOG_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of log records waiting for the background thread, further records are dropped",
+        default=10000,
+    )
+
+    LOG_FILE_SINGLE_WRITER: bool = Field(
+        description="Let a single process per host write and rotate LOG_FILE, other workers forward their lines to it",
+        default=True,
+    )
+
+    LOG_RATE_LIMIT: NonNegativeInt = Field(
+        description="Maximum records per second from each request hot-path log call site below WARNING, "
+                    "0 disables the limit",
+        default=20,
+    )
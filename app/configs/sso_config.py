@@ -1,4 +1,4 @@
-from pydantic import Field
+from pydantic import Field, NonNegativeInt, PositiveFloat, PositiveInt
 from pydantic_settings import BaseSettings
 
 
@@ -32,3 +32,86 @@ class SSOConfig(BaseSettings):
         description="Response type for the OpenID Connect provider",
         default="code",
     )
+
+    OIDC_GROUPS_CLAIM: str = Field(
+        description="Userinfo / ID token claim that carries the user's group memberships",
+        default="groups",
+    )
+
+    OIDC_DISCOVERY_CACHE_FILE: str = Field(
+        description="File the OIDC discovery document is persisted to, defaults to a file in the system temp directory",
+        default="",
+    )
+
+    OIDC_DISCOVERY_CACHE_TTL: NonNegativeInt = Field(
+        description="Lifetime in seconds of the discovery document when the IdP sends no cache headers",
+        default=3600,
+    )
+
+    OIDC_DISCOVERY_MIN_TTL: NonNegativeInt = Field(
+        description="Lower bound in seconds for the discovery document lifetime announced by the IdP",
+        default=60,
+    )
+
+    OIDC_DISCOVERY_MAX_TTL: NonNegativeInt = Field(
+        description="Upper bound in seconds for the discovery document lifetime announced by the IdP",
+        default=86400,
+    )
+
+    OIDC_DISCOVERY_REFRESH_RATIO: float = Field(
+        description="Fraction of the document lifetime after which it is refreshed in the background",
+        default=0.8,
+        gt=0,
+        le=1,
+    )
+
+    OIDC_DISCOVERY_RETRY_INTERVAL: NonNegativeInt = Field(
+        description="Seconds to wait before retrying a failed background refresh of the discovery document",
+        default=30,
+    )
+
+    OIDC_ID_TOKEN_CLAIMS_ENABLED: bool = Field(
+        description="Validate the ID token locally and take user claims from it, "
+                    "calling the userinfo endpoint only when required claims are missing",
+        default=False,
+    )
+
+    OIDC_ID_TOKEN_REQUIRED_CLAIMS: str = Field(
+        description="Comma separated claims the ID token must carry to skip the userinfo call",
+        default="email,name,roles",
+    )
+
+    OIDC_ID_TOKEN_ALGORITHMS: str = Field(
+        description="Comma separated signing algorithms accepted for ID tokens",
+        default="RS256,ES256,PS256",
+    )
+
+    OIDC_ID_TOKEN_LEEWAY: NonNegativeInt = Field(
+        description="Clock skew in seconds tolerated when validating ID tokens",
+        default=30,
+    )
+
+    OIDC_JWKS_CACHE_TTL: PositiveInt = Field(
+        description="Seconds the IdP's signing keys are cached",
+        default=3600,
+    )
+
+    OIDC_JWKS_MIN_REFRESH_INTERVAL: NonNegativeInt = Field(
+        description="Minimum seconds between JWKS refetches triggered by an unknown key id",
+        default=60,
+    )
+
+    OIDC_HTTP_POOL_SIZE: PositiveInt = Field(
+        description="Maximum number of keep-alive connections kept open to the OpenID Connect provider",
+        default=20,
+    )
+
+    OIDC_HTTP_CONNECT_TIMEOUT: PositiveFloat = Field(
+        description="Connect timeout in seconds for requests to the OpenID Connect provider",
+        default=3.0,
+    )
+
+    OIDC_HTTP_READ_TIMEOUT: PositiveFloat = Field(
+        description="Read timeout in seconds for requests to the OpenID Connect provider",
+        default=10.0,
+    )
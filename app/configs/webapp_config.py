@@ -0,0 +1,70 @@
+from pydantic import Field, NonNegativeInt, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class WebAppConfig(BaseSettings):
+    """
+    Configuration for webapp access control
+    """
+
+    WEBAPP_ACCESS_POLICY_CACHE_ENABLED: bool = Field(
+        description="Enable the in-process cache of compiled webapp access policies",
+        default=True,
+    )
+
+    WEBAPP_ACCESS_POLICY_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of app access policies kept in the in-process cache",
+        default=10000,
+    )
+
+    WEBAPP_ACCESS_POLICY_CACHE_TTL: NonNegativeInt = Field(
+        description="Safety TTL in seconds for cached access policies in case an invalidation message is lost, "
+                    "0 disables expiry",
+        default=300,
+    )
+
+    WEBAPP_ACCESS_POLICY_INLINE_MEMBERS: NonNegativeInt = Field(
+        description="Apps with at most this many allowed accounts keep the member set in process, "
+                    "larger apps are checked with SISMEMBER",
+        default=1000,
+    )
+
+    WEBAPP_USER_GROUPS_TTL: NonNegativeInt = Field(
+        description="TTL in seconds for the group memberships recorded at login, 0 disables expiry",
+        default=30 * 24 * 3600,
+    )
+
+    WEBAPP_ACCESS_POLICY_CHANNEL: str = Field(
+        description="Redis pub/sub channel used to broadcast access policy invalidations between workers",
+        default="webapp_access_mode:invalidate",
+    )
+
+    ACCOUNT_DIRECTORY_ENABLED: bool = Field(
+        description="Keep an in-memory index of active accounts in each worker and answer subject search from it",
+        default=False,
+    )
+
+    ACCOUNT_DIRECTORY_REFRESH_INTERVAL: PositiveInt = Field(
+        description="Seconds between polls of accounts.updated_at for changes to the account directory",
+        default=30,
+    )
+
+    ACCOUNT_DIRECTORY_FULL_REFRESH_INTERVAL: PositiveInt = Field(
+        description="Seconds between full reloads of the account directory, which also drop deleted accounts",
+        default=3600,
+    )
+
+    SITE_CODE_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of site code to app id mappings kept in the in-process cache",
+        default=10000,
+    )
+
+    SITE_CODE_CACHE_TTL: NonNegativeInt = Field(
+        description="TTL in seconds for cached site code to app id mappings, 0 disables the cache",
+        default=3600,
+    )
+
+    SITE_CODE_NEGATIVE_CACHE_TTL: NonNegativeInt = Field(
+        description="TTL in seconds for caching unknown site codes",
+        default=60,
+    )
@@ -0,0 +1,13 @@
+from flask import Flask
+
+
+def init_app(app: Flask):
+    from app.commands import create_subject_search_index, migrate_webapp_access_mode
+
+    cmds_to_register = [
+        migrate_webapp_access_mode,
+        create_subject_search_index,
+    ]
+
+    for cmd in cmds_to_register:
+        app.cli.add_command(cmd)
@@ -5,3 +5,10 @@ from app.models import db
 
 def init_app(app: Flask):
     db.init_app(app)
+
+
+def after_fork(app: Flask):
+    # 连接由父进程创建，close=False 只丢弃而不关闭，避免断开父进程仍在使用的连接
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,16 @@
+from flask import Flask
+
+from app.services.health import HealthProber
+
+
+def init_app(app: Flask):
+    app.extensions["health"] = HealthProber
+
+
+def start(app: Flask):
+    # 后台定期探测数据库、Redis 和 IdP，/health?detail 直接返回缓存结果
+    HealthProber.start(app)
+
+
+def after_fork(app: Flask):
+    HealthProber.after_fork()
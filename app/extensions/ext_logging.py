@@ -1,35 +1,77 @@
+import atexit
 import logging
 import os
 import sys
+import time
 import uuid
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 
 import flask
 from flask import Flask
 
 from app.configs import config
+from app.libs import request_timing
+from app.libs.log_pipeline import (
+    HostFileHandler,
+    JsonFormatter,
+    RateLimitFilter,
+    host_file_supported,
+    restart_queue_listener,
+    start_queue_listener,
+)
+
+# 请求热路径使用的 logger，对其记录做限流
+HOT_PATH_LOGGERS = ("app.api.router",)
+
+_log_handlers: list[logging.Handler] = []
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
 
 
 def init_app(app: Flask):
+    global _log_handlers, _queue_handler, _listener
     log_handlers: list[logging.Handler] = []
     log_file = config.LOG_FILE
     if log_file:
         log_dir = os.path.dirname(log_file)
         os.makedirs(log_dir, exist_ok=True)
-        log_handlers.append(
-            RotatingFileHandler(
+        if config.LOG_FILE_SINGLE_WRITER and host_file_supported():
+            # 同一主机上只有一个进程写入和轮转日志文件
+            file_handler: logging.Handler = HostFileHandler(
+                filename=log_file,
+                max_bytes=config.LOG_FILE_MAX_SIZE * 1024 * 1024,
+                backup_count=config.LOG_FILE_BACKUP_COUNT,
+            )
+        else:
+            file_handler = RotatingFileHandler(
                 filename=log_file,
                 maxBytes=config.LOG_FILE_MAX_SIZE * 1024 * 1024,
                 backupCount=config.LOG_FILE_BACKUP_COUNT,
             )
-        )
+        log_handlers.append(file_handler)
 
     # Always add StreamHandler to log to console
     sh = logging.StreamHandler(sys.stdout)
     log_handlers.append(sh)
 
-    # Apply RequestIdFilter to all handlers
+    formatter = create_formatter()
     for handler in log_handlers:
+        handler.setFormatter(formatter)
+
+    if config.LOG_QUEUE_ENABLED:
+        # 请求线程只把记录放入队列，格式化和 I/O 在后台线程完成
+        queue_handler, listener = start_queue_listener(log_handlers, config.LOG_QUEUE_SIZE)
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        atexit.register(listener.stop)
+        _queue_handler, _listener = queue_handler, listener
+        root_handlers: list[logging.Handler] = [queue_handler]
+    else:
+        root_handlers = log_handlers
+    _log_handlers = log_handlers
+
+    # Apply RequestIdFilter to all handlers
+    for handler in root_handlers:
         handler.addFilter(RequestIdFilter())
 
     if config.DEBUG:
@@ -39,19 +81,41 @@ def init_app(app: Flask):
 
     logging.basicConfig(
         level=log_level,
-        format=config.LOG_FORMAT,
-        datefmt=config.LOG_DATEFORMAT,
-        handlers=log_handlers,
+        handlers=root_handlers,
         force=True,
     )
 
-    # Apply RequestIdFormatter to all handlers
-    apply_request_id_formatter()
+    if config.LOG_RATE_LIMIT:
+        for name in HOT_PATH_LOGGERS:
+            logging.getLogger(name).addFilter(RateLimitFilter(config.LOG_RATE_LIMIT))
 
     # Disable propagation for noisy loggers to avoid duplicate logs
     logging.getLogger("sqlalchemy.engine").propagate = False
+
+
+def after_fork(app: Flask):
+    global _listener
+    for handler in _log_handlers:
+        if isinstance(handler, HostFileHandler):
+            handler.writer.after_fork()
+    if _listener is not None:
+        # 父进程的后台线程在子进程中不存在，换用新的队列和线程
+        atexit.unregister(_listener.stop)
+        _listener = restart_queue_listener(_queue_handler, _listener, config.LOG_QUEUE_SIZE)
+        atexit.register(_listener.stop)
+
+
+def create_formatter() -> logging.Formatter:
+    if config.LOG_JSON:
+        formatter: logging.Formatter = JsonFormatter(datefmt=config.LOG_DATEFORMAT)
+    else:
+        formatter = RequestIdFormatter(config.LOG_FORMAT, config.LOG_DATEFORMAT)
+
     log_tz = config.LOG_TZ
-    if log_tz:
+    if log_tz and log_tz.upper() == "UTC":
+        # 默认的 UTC 不需要时区库，直接使用 gmtime
+        formatter.converter = time.gmtime
+    elif log_tz:
         from datetime import datetime
 
         import pytz
@@ -61,9 +125,8 @@ def init_app(app: Flask):
         def time_converter(seconds):
             return datetime.fromtimestamp(seconds, tz=timezone).timetuple()
 
-        for handler in logging.root.handlers:
-            if handler.formatter:
-                handler.formatter.converter = time_converter
+        formatter.converter = time_converter
+    return formatter
 
 
 def get_request_id():
@@ -82,6 +145,9 @@ class RequestIdFilter(logging.Filter):
     # context, as we may want to log things before Flask is fully loaded.
     def filter(self, record):
         record.req_id = get_request_id() if flask.has_request_context() else ""
+        # 启用 REQUEST_TIMING_ENABLED 时附带当前请求已累计的 I/O 耗时
+        timeline = request_timing.current()
+        record.timing = timeline.summary() if timeline is not None else ""
         return True
 
 
@@ -89,10 +155,6 @@ class RequestIdFormatter(logging.Formatter):
     def format(self, record):
         if not hasattr(record, "req_id"):
             record.req_id = ""
+        if not hasattr(record, "timing"):
+            record.timing = ""
         return super().format(record)
-
-
-def apply_request_id_formatter():
-    for handler in logging.root.handlers:
-        if handler.formatter:
-            handler.formatter = RequestIdFormatter(config.LOG_FORMAT, config.LOG_DATEFORMAT)
@@ -0,0 +1,15 @@
+from flask import Flask
+
+from app.services.login_info import LoginInfoWriter
+
+
+def init_app(app: Flask):
+    app.extensions["login_info"] = LoginInfoWriter
+
+
+def start(app: Flask):
+    LoginInfoWriter.start(app)
+
+
+def after_fork(app: Flask):
+    LoginInfoWriter.after_fork()
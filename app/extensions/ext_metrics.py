@@ -0,0 +1,46 @@
+import time
+
+from flask import Flask, Response, g, request
+
+from app.configs import config
+from app.extensions.ext_database import db
+from app.extensions.ext_redis import redis_client
+from app.libs import instrumentation
+from app.libs.metrics import DB_POOL_CONNECTIONS, REDIS_POOL_CONNECTIONS, REQUEST_LATENCY, REQUESTS
+
+
+def init_app(app: Flask):
+    if not config.METRICS_ENABLED:
+        return
+
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    instrumentation.install(redis_client._client)
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _observe_request(response: Response) -> Response:
+    start = g.pop("metrics_start", None)
+    if start is not None:
+        # 使用路由模板而不是实际路径，避免标签基数随参数增长
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.labels(method=request.method, route=route).observe(time.perf_counter() - start)
+        REQUESTS.labels(method=request.method, route=route, status=str(response.status_code)).inc()
+    _sample_pools()
+    return response
+
+
+def _sample_pools():
+    pool = db.engine.pool
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CONNECTIONS.labels(state="in_use").set(pool.checkedout())
+        DB_POOL_CONNECTIONS.labels(state="idle").set(pool.checkedin())
+
+    # 集群模式下每个节点各有连接池，这里只统计单机和哨兵模式
+    redis_pool = getattr(redis_client._client, "connection_pool", None)
+    if hasattr(redis_pool, "_in_use_connections"):
+        REDIS_POOL_CONNECTIONS.labels(state="in_use").set(len(redis_pool._in_use_connections))
+        REDIS_POOL_CONNECTIONS.labels(state="idle").set(len(redis_pool._available_connections))
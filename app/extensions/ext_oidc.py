@@ -6,4 +6,10 @@ oidc_service = OIDCService()
 
 
 def init_app(app: Flask):
+    # 后台预热 OIDC 配置，不阻塞 worker 启动；预加载时在 master 中执行一次，worker 直接继承
+    oidc_service.discovery.prefetch()
     app.extensions["oidc"] = oidc_service
+
+
+def after_fork(app: Flask):
+    oidc_service.after_fork()
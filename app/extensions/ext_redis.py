@@ -44,6 +44,16 @@ class RedisClientWrapper:
         if self._client is None:
             self._client = client
 
+    def after_fork(self):
+        """
+        drops the connections inherited from the parent process without closing them,
+        since the parent still uses the same sockets; the pool reconnects on demand.
+        """
+        pool = getattr(self._client, "connection_pool", None)
+        if pool is not None:
+            pool.reset()
+        # RedisCluster 的各节点连接池在检测到 pid 变化时会自行重置
+
     def __getattr__(self, item):
         if self._client is None:
             raise RuntimeError("Redis client is not initialized. Call init_app first.")
@@ -124,6 +134,10 @@ def init_app(app: Flask):
     app.extensions["redis"] = redis_client
 
 
+def after_fork(app: Flask):
+    redis_client.after_fork()
+
+
 def redis_fallback(default_return: Any = None):
     """
     decorator to handle Redis operation exceptions and return a default value when Redis is unavailable.
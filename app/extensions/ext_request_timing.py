@@ -0,0 +1,42 @@
+import logging
+
+from flask import Flask, Response, request
+
+from app.configs import config
+from app.extensions.ext_redis import redis_client
+from app.libs import instrumentation, request_timing
+
+logger = logging.getLogger(__name__)
+
+
+def init_app(app: Flask):
+    # 未启用时不注册任何钩子，请求路径上没有额外开销
+    if not config.REQUEST_TIMING_ENABLED:
+        return
+
+    app.before_request(_start_timeline)
+    app.after_request(_finish_timeline)
+    app.teardown_request(_clear_timeline)
+    instrumentation.install(redis_client._client)
+
+
+def _start_timeline():
+    request_timing.start()
+
+
+def _finish_timeline(response: Response) -> Response:
+    timeline = request_timing.current()
+    if timeline is None:
+        return response
+    response.headers["Server-Timing"] = timeline.server_timing()
+    elapsed = timeline.elapsed_ms()
+    if elapsed >= config.REQUEST_TIMING_LOG_THRESHOLD:
+        logger.info(
+            "%s %s %s %s ms %s", request.method, request.path, response.status_code, elapsed, timeline.summary(),
+            extra={"timeline": timeline.events},
+        )
+    return response
+
+
+def _clear_timeline(exc):
+    request_timing.stop()
@@ -0,0 +1,17 @@
+from flask import Flask
+
+from app.services.account_directory import AccountDirectory
+from app.services.subject_search import SubjectSearchService
+
+
+def init_app(app: Flask):
+    app.extensions["subject_search"] = SubjectSearchService
+
+
+def start(app: Flask):
+    # 后台加载账号目录，加载完成前搜索仍查询数据库
+    AccountDirectory.start(app)
+
+
+def after_fork(app: Flask):
+    AccountDirectory.after_fork()
@@ -0,0 +1,15 @@
+from flask import Flask
+
+from app.services.webapp_access import WebAppAccessService
+
+
+def init_app(app: Flask):
+    app.extensions["webapp_access"] = WebAppAccessService
+
+
+def start(app: Flask):
+    WebAppAccessService.start_invalidation_listener()
+
+
+def after_fork(app: Flask):
+    WebAppAccessService.after_fork()
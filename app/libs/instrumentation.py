@@ -0,0 +1,87 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.configs import config
+from app.libs import request_timing
+from app.libs.metrics import DB_LATENCY, REDIS_LATENCY
+
+# 指标和请求耗时共用同一组钩子，每条语句和每个 Redis 命令只计时一次
+_installed_clients: set[int] = set()
+_engine_listening = False
+
+
+def install(redis_client):
+    """
+    Times every SQL statement and every command sent by `redis_client`.
+
+    Each measurement is observed in the latency histograms when `METRICS_ENABLED` is set
+    and added to the current request timeline, if any. Safe to call from every extension
+    that needs the measurements; the hooks are installed once.
+    """
+    global _engine_listening
+    if not _engine_listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _engine_listening = True
+    if id(redis_client) not in _installed_clients:
+        _instrument_redis(redis_client)
+        _installed_clients.add(id(redis_client))
+
+
+def _observe(category: str, name: str, start: float):
+    if config.METRICS_ENABLED:
+        histogram = DB_LATENCY.labels(statement=name) if category == "db" else REDIS_LATENCY.labels(command=name)
+        histogram.observe(time.perf_counter() - start)
+    request_timing.record(category, name, start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    _observe("db", kind, starts.pop())
+
+
+def _handle_error(context):
+    # 语句执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _instrument_redis(client):
+    """times every command sent by the client, and each pipeline as a whole"""
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    def timed_execute_command(*args, **options):
+        start = time.perf_counter()
+        try:
+            return execute_command(*args, **options)
+        finally:
+            _observe("redis", str(args[0]).split(" ", 1)[0].upper() if args else "UNKNOWN", start)
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def timed_execute(*execute_args, **execute_kwargs):
+            start = time.perf_counter()
+            try:
+                return execute(*execute_args, **execute_kwargs)
+            finally:
+                _observe("redis", "PIPELINE", start)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = timed_pipeline
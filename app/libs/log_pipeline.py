@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 单个 datagram 的最大长度，超出部分会被截断
+MAX_DATAGRAM_SIZE = 64 * 1024
+
+# LogRecord 的标准属性，其余属性视为通过 extra 传入的结构化字段
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "req_id", "timing",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, keeping `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "req_id": getattr(record, "req_id", ""),
+            "timing": getattr(record, "timing", ""),
+            "thread": record.threadName,
+            "process": record.process,
+            "location": f"{record.filename}:{record.lineno}",
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the caller.
+
+    Records are dropped and counted when the bounded queue is full. Filters such as the
+    request id filter run here, in the calling thread, where the request context exists;
+    formatting and I/O happen in the listener thread.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `rate` records per message template through every `interval` seconds.
+
+    When a window closes, the next record that passes reports how many were suppressed.
+    """
+
+    def __init__(self, rate: int, interval: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.interval = interval
+        self._windows: dict[tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class HostFileWriter:
+    """
+    Elects a single process per host to own the rotating log file.
+
+    The process holding an exclusive lock on `<log file>.lock` writes the file and
+    receives already formatted lines from the other workers on a UNIX datagram socket at
+    `<log file>.sock`. Other processes forward their lines there and try to take over
+    the lock whenever the owner stops answering. Only rotation-safe as long as every
+    worker runs on the same host, which is what the lock and socket paths imply.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.lock_path = f"{filename}.lock"
+        self.sock_path = f"{filename}.sock"
+        self._lock_file = None
+        self._file_handler: Optional[RotatingFileHandler] = None
+        self._server: Optional[socket.socket] = None
+        self._client = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._mutex = threading.Lock()
+        self.try_become_writer()
+
+    @property
+    def is_writer(self) -> bool:
+        return self._file_handler is not None
+
+    def try_become_writer(self) -> bool:
+        with self._mutex:
+            if self.is_writer:
+                return True
+            lock_file = open(self.lock_path, "a")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+
+            self._lock_file = lock_file
+            self._file_handler = RotatingFileHandler(
+                self.filename, maxBytes=self.max_bytes, backupCount=self.backup_count
+            )
+            self._file_handler.setFormatter(logging.Formatter("%(message)s"))
+            try:
+                os.unlink(self.sock_path)
+            except FileNotFoundError:
+                pass
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._server.bind(self.sock_path)
+            threading.Thread(target=self._serve, name="log-file-writer", daemon=True).start()
+            return True
+
+    def _serve(self):
+        while True:
+            try:
+                data = self._server.recv(MAX_DATAGRAM_SIZE)
+            except OSError:
+                return
+            self.write(data.decode(errors="replace"))
+
+    def write(self, line: str):
+        record = logging.LogRecord("", logging.INFO, "", 0, line, None, None)
+        # handle() 持有 handler 锁，监听线程和 socket 线程同时写入时不会并发轮转
+        self._file_handler.handle(record)
+
+    def send(self, line: str):
+        if self.is_writer:
+            self.write(line)
+            return
+        data = line.encode()[:MAX_DATAGRAM_SIZE]
+        try:
+            self._client.sendto(data, self.sock_path)
+        except OSError:
+            # 写入进程已退出，尝试接管
+            if self.try_become_writer():
+                self.write(line)
+
+    def after_fork(self):
+        """
+        hands the file back to the parent in a forked child.
+
+        The child's copy of the lock file descriptor shares the parent's flock, so
+        closing it keeps the parent as the writer; the child only forwards lines.
+        """
+        self._mutex = threading.Lock()
+        self._client = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        if self._file_handler is None:
+            return
+        self._server.close()
+        self._server = None
+        self._file_handler.close()
+        self._file_handler = None
+        self._lock_file.close()
+        self._lock_file = None
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            try:
+                os.unlink(self.sock_path)
+            except OSError:
+                pass
+        if self._file_handler is not None:
+            self._file_handler.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+        self._client.close()
+
+
+class HostFileHandler(logging.Handler):
+    """Writes formatted records through the host's single log file writer."""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        super().__init__()
+        self.writer = HostFileWriter(filename, max_bytes, backup_count)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.writer.send(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.writer.close()
+        super().close()
+
+
+def host_file_supported() -> bool:
+    return fcntl is not None and hasattr(socket, "AF_UNIX")
+
+
+def start_queue_listener(handlers: list[logging.Handler], maxsize: int) -> tuple[QueueHandler, QueueListener]:
+    log_queue: queue.Queue = queue.Queue(maxsize=maxsize)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return DroppingQueueHandler(log_queue), listener
+
+
+def restart_queue_listener(queue_handler: QueueHandler, listener: QueueListener, maxsize: int) -> QueueListener:
+    """
+    gives a forked child its own queue and listener thread; the parent's thread does
+    not exist in the child and its queue lock may have been held at fork time.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=maxsize)
+    new_listener = QueueListener(log_queue, *listener.handlers, respect_handler_level=True)
+    queue_handler.queue = log_queue
+    new_listener.start()
+    return new_listener
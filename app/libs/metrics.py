@@ -0,0 +1,89 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# 设置 PROMETHEUS_MULTIPROC_DIR 时各 worker 把指标写入该目录的 mmap 文件，抓取时合并
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# 大部分请求在毫秒级完成，IdP 调用可能达到秒级
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "dify_sso_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "dify_sso_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+ACCESS_DECISIONS = Counter(
+    "dify_sso_access_decisions_total",
+    "WebApp permission checks by access mode and result",
+    ["mode", "result"],
+)
+REDIS_LATENCY = Histogram(
+    "dify_sso_redis_command_duration_seconds",
+    "Redis command latency, pipelines are recorded as a single PIPELINE command",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_LATENCY = Histogram(
+    "dify_sso_db_query_duration_seconds",
+    "SQL statement latency by statement type",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+IDP_LATENCY = Histogram(
+    "dify_sso_idp_request_duration_seconds",
+    "Latency of calls to the OIDC provider",
+    ["endpoint", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "dify_sso_db_pool_connections",
+    "SQLAlchemy pool connections by state, summed over live workers",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "dify_sso_redis_pool_connections",
+    "Redis pool connections by state, summed over live workers",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def track(histogram: Histogram, **labels):
+    """observes the duration of the block, labelled outcome=ok or outcome=error"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - start)
+
+
+def render() -> tuple[bytes, str]:
+    """returns the exposition of all metrics, merged across workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,90 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# 单个请求最多记录的 I/O 事件数量，超出后只累计总耗时
+MAX_EVENTS = 200
+
+_current: ContextVar[Optional["RequestTimeline"]] = ContextVar("request_timeline", default=None)
+
+
+class RequestTimeline:
+    """
+    Per-request record of the time spent in each backend (db, redis, idp, jwt).
+
+    Bound to the current context while the request runs, so instrumentation anywhere in
+    the call stack can add to it; code running outside a request finds no timeline and
+    records nothing.
+    """
+
+    __slots__ = ("started", "totals", "events")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # category -> [次数, 累计秒数]
+        self.totals: dict[str, list] = {}
+        # (category, name, 相对请求开始的毫秒数, 耗时毫秒数)
+        self.events: list[tuple[str, str, float, float]] = []
+
+    def add(self, category: str, name: str, start: float, duration: float):
+        total = self.totals.get(category)
+        if total is None:
+            self.totals[category] = [1, duration]
+        else:
+            total[0] += 1
+            total[1] += duration
+        if len(self.events) < MAX_EVENTS:
+            self.events.append((category, name, round((start - self.started) * 1000, 2), round(duration * 1000, 2)))
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def server_timing(self) -> str:
+        """formats the totals as a Server-Timing header value"""
+        parts = [
+            f'{category};dur={seconds * 1000:.2f};desc="{count}"'
+            for category, (count, seconds) in self.totals.items()
+        ]
+        parts.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(parts)
+
+    def summary(self) -> str:
+        """formats the totals for log records, e.g. `db=3/12.40ms redis=5/1.10ms`"""
+        return " ".join(
+            f"{category}={count}/{seconds * 1000:.2f}ms" for category, (count, seconds) in self.totals.items()
+        )
+
+
+def start() -> RequestTimeline:
+    timeline = RequestTimeline()
+    _current.set(timeline)
+    return timeline
+
+
+def stop():
+    _current.set(None)
+
+
+def current() -> Optional[RequestTimeline]:
+    return _current.get()
+
+
+def record(category: str, name: str, start_time: float):
+    """adds an operation that started at `start_time` (perf_counter) and ends now"""
+    timeline = _current.get()
+    if timeline is not None:
+        timeline.add(category, name, start_time, time.perf_counter() - start_time)
+
+
+@contextmanager
+def span(category: str, name: str):
+    timeline = _current.get()
+    if timeline is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timeline.add(category, name, start_time, time.perf_counter() - start_time)
@@ -0,0 +1,29 @@
+import hashlib
+import json
+from typing import Any
+
+from flask import Response, request
+
+from app.configs import config
+
+
+class StaticPayload:
+    """
+    A JSON response body serialized once, served with a strong ETag.
+
+    Requests whose If-None-Match carries the ETag are answered with an empty 304.
+    """
+
+    def __init__(self, data: Any):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+    def response(self) -> Response:
+        headers = {"Cache-Control": f"private, max-age={config.STATIC_PAYLOAD_MAX_AGE}"}
+        # If-None-Match 使用弱比较，代理加了 W/ 前缀的 ETag 也能命中
+        if request.if_none_match.contains_weak(self.etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(self.body, mimetype="application/json", headers=headers)
+        response.set_etag(self.etag)
+        return response
@@ -4,7 +4,7 @@ from datetime import UTC, datetime
 from typing import Optional
 
 from flask_login import UserMixin
-from sqlalchemy import DateTime, String, func
+from sqlalchemy import DateTime, String, func, select, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -208,6 +208,79 @@ class Account(UserMixin, Base):
         db.session.commit()
         return account
 
+    # 查找或创建账号并确保租户关联，全部在一条语句中完成。
+    # 名称、状态和角色未变化时不写任何行，登录信息由 LoginInfoWriter 合并后批量写入。
+    # existing 不加 FOR UPDATE：未变化的登录不应锁行，而 UPDATE 在取得行锁后会重新判断 IS DISTINCT FROM，
+    # 并发登录写入的是相同的值。accounts.email 没有唯一约束，同一新邮箱的并发首次登录仍可能各插入一个账号，
+    # 加 FOR UPDATE 也锁不住尚不存在的行
+    _UPSERT_LOGIN_SQL = text("""
+        WITH existing AS (
+            SELECT * FROM accounts WHERE email = :email ORDER BY created_at LIMIT 1
+        ),
+        updated AS (
+            UPDATE accounts
+            SET name = :name, status = :status, updated_at = CURRENT_TIMESTAMP
+            WHERE id IN (SELECT id FROM existing)
+              AND (name IS DISTINCT FROM :name OR status IS DISTINCT FROM :status)
+            RETURNING accounts.*
+        ),
+        inserted AS (
+            INSERT INTO accounts (email, name, avatar, interface_theme, interface_language, timezone, status,
+                                  initialized_at, last_login_at, last_login_ip)
+            SELECT :email, :name, '', 'light', 'zh-Hans', 'Asia/Shanghai', :status,
+                   :login_at, :login_at, :login_ip
+            WHERE NOT EXISTS (SELECT 1 FROM existing)
+            RETURNING accounts.*
+        ),
+        account AS (
+            SELECT * FROM updated
+            UNION ALL
+            SELECT * FROM existing WHERE NOT EXISTS (SELECT 1 FROM updated)
+            UNION ALL
+            SELECT * FROM inserted
+        ),
+        role_updated AS (
+            UPDATE tenant_account_joins
+            SET role = :role, updated_at = CURRENT_TIMESTAMP
+            WHERE tenant_id = CAST(:tenant_id AS uuid)
+              AND account_id IN (SELECT id FROM account)
+              AND role IS DISTINCT FROM :role
+        ),
+        joined AS (
+            INSERT INTO tenant_account_joins (tenant_id, account_id, role)
+            SELECT CAST(:tenant_id AS uuid), id, :role FROM account
+            ON CONFLICT (tenant_id, account_id) DO NOTHING
+        )
+        SELECT * FROM account
+    """)
+
+    @classmethod
+    def upsert_login(cls, tenant_id: str, email: str, name: str, role: str, login_at: datetime, login_ip: str):
+        """
+        Binds a login to its account in one statement and commits.
+
+        The account is created with its login info if no account has this email, otherwise
+        its name and status are updated only if they changed. The tenant join is inserted
+        with ON CONFLICT DO NOTHING and its role updated only if it changed. The returned
+        account is detached with all columns loaded, so reading it after the commit does
+        not issue reload SELECTs.
+        """
+        account = db.session.execute(
+            select(cls).from_statement(cls._UPSERT_LOGIN_SQL),
+            {
+                "tenant_id": tenant_id,
+                "email": email,
+                "name": name,
+                "role": str(role),
+                "status": str(AccountStatus.ACTIVE),
+                "login_at": login_at,
+                "login_ip": login_ip,
+            },
+        ).scalar_one()
+        db.session.expunge(account)
+        db.session.commit()
+        return account
+
 
 class TenantStatus(enum.StrEnum):
     NORMAL = "normal"
@@ -1,15 +1,19 @@
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from typing import Optional
 
 from pydantic import BaseModel
 
 from app.configs import config
 from app.extensions.ext_database import db
 from app.extensions.ext_redis import redis_client
+from app.libs.cache import LRUCache
 from app.libs.helper import naive_utc_now
 from app.models.account import (
     Account,
     AccountStatus,
 )
+from app.services.login_info import LoginInfoWriter
 from app.services.passport import PassportService
 from app.services.token import TokenService
 
@@ -20,7 +24,48 @@ class TokenPair(BaseModel):
     csrf_token: str
 
 
+@dataclass(frozen=True, slots=True)
+class LoginSnapshot:
+    """What the login path last wrote for an email."""
+
+    account_id: str
+    name: str
+    status: str
+    role: str
+
+    def matches(self, name: str, role: str) -> bool:
+        return self.name == name and self.status == AccountStatus.ACTIVE and self.role == role
+
+    def to_account(self, email: str) -> Account:
+        # 未加入 session 的账号对象，仅携带登录流程需要的字段
+        return Account(id=self.account_id, email=email, name=self.name, status=self.status)
+
+
 class AccountService:
+    # 邮箱 -> 最近一次登录写入的账号信息，资料未变化的重复登录无需访问数据库
+    _login_cache = LRUCache(maxsize=config.ACCOUNT_LOGIN_CACHE_SIZE, ttl=config.ACCOUNT_LOGIN_CACHE_TTL)
+
+    @classmethod
+    def get_login_snapshot(cls, email: str) -> Optional[LoginSnapshot]:
+        if not config.ACCOUNT_LOGIN_CACHE_TTL:
+            return None
+        return cls._login_cache.get(email)
+
+    @classmethod
+    def set_login_snapshot(cls, email: str, account: Account, role: str):
+        if config.ACCOUNT_LOGIN_CACHE_TTL:
+            cls._login_cache.set(
+                email, LoginSnapshot(account_id=str(account.id), name=account.name, status=account.status, role=role)
+            )
+
+    @classmethod
+    def after_fork(cls):
+        cls._login_cache.after_fork()
+
+    @classmethod
+    def login_cache_stats(cls) -> dict:
+        return cls._login_cache.stats()
+
     @staticmethod
     def _get_refresh_token_key(refresh_token: str) -> str:
         return f"{config.REFRESH_TOKEN_PREFIX}{refresh_token}"
@@ -53,10 +98,7 @@ class AccountService:
 
     @staticmethod
     def update_login_info(account: Account, *, ip_address: str):
-        account.last_login_at = naive_utc_now()
-        account.last_login_ip = ip_address
-        db.session.add(account)
-        db.session.commit()
+        LoginInfoWriter.record(str(account.id), naive_utc_now(), ip_address)
 
     @staticmethod
     def login(account: Account, ip_address: str | None = None) -> TokenPair:
@@ -0,0 +1,229 @@
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from flask import Flask
+from sqlalchemy import select
+
+from app.configs import config
+from app.extensions.ext_database import db
+from app.models.account import Account, AccountStatus
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+
+
+@dataclass(frozen=True, slots=True)
+class DirectoryEntry:
+    """The fields of an active account needed by the access-control dialog."""
+
+    id: str
+    name: str
+    email: str
+    avatar: str
+
+    @property
+    def sort_key(self) -> tuple[str, str]:
+        # 码点顺序，对应数据库查询中的 ORDER BY name COLLATE "C", id
+        return self.name, self.id
+
+    @property
+    def search_text(self) -> str:
+        # 名称和邮箱之间用 \0 分隔，避免匹配跨越两个字段
+        return f"{self.name.lower()}\0{self.email.lower()}"
+
+
+def _ngrams(value: str) -> set[str]:
+    return {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+
+class AccountDirectory:
+    """
+    Optional per-worker in-memory index of active accounts.
+
+    Built in a background thread at startup and kept current by polling
+    `accounts.updated_at` every `ACCOUNT_DIRECTORY_REFRESH_INTERVAL` seconds, with a full
+    reload every `ACCOUNT_DIRECTORY_FULL_REFRESH_INTERVAL` seconds to drop deleted rows.
+    Substring search intersects trigram posting sets and verifies the candidates, so
+    typeahead never touches Postgres. Callers must check `ready()` and fall back to the
+    database until the first build has finished.
+    """
+
+    _entries: dict[str, DirectoryEntry] = {}
+    _postings: dict[str, set[str]] = {}
+    # 按 (name, id) 排序的条目，变更后惰性重建
+    _sorted: Optional[list[DirectoryEntry]] = None
+    _lock = threading.RLock()
+    _ready = False
+    _since: Optional[datetime] = None
+    _app: Optional[Flask] = None
+    _poller: Optional[threading.Thread] = None
+
+    @classmethod
+    def ready(cls) -> bool:
+        return cls._ready
+
+    @classmethod
+    def start(cls, app: Flask):
+        if not config.ACCOUNT_DIRECTORY_ENABLED:
+            return
+        cls._app = app
+        if cls._poller is not None and cls._poller.is_alive():
+            return
+        cls._poller = threading.Thread(target=cls._run, name="account-directory", daemon=True)
+        cls._poller.start()
+
+    @classmethod
+    def after_fork(cls):
+        """keeps the entries loaded by the parent, shared copy-on-write, and restarts polling in the child"""
+        cls._lock = threading.RLock()
+        cls._poller = None
+
+    @classmethod
+    def _run(cls):
+        last_full = 0.0
+        while True:
+            try:
+                with cls._app.app_context():
+                    if time.monotonic() - last_full >= config.ACCOUNT_DIRECTORY_FULL_REFRESH_INTERVAL:
+                        cls._load_full()
+                        last_full = time.monotonic()
+                    else:
+                        cls._load_changes()
+            except Exception as e:
+                logger.warning("Failed to refresh the account directory: %s", str(e))
+            time.sleep(config.ACCOUNT_DIRECTORY_REFRESH_INTERVAL)
+
+    @staticmethod
+    def _query_rows(since: Optional[datetime]):
+        stmt = select(
+            Account.id, Account.name, Account.email, Account.avatar, Account.status, Account.updated_at
+        )
+        if since is None:
+            stmt = stmt.where(Account.status == AccountStatus.ACTIVE)
+        else:
+            # 使用 >= 并重复处理边界上的行，避免漏掉同一时间戳的更新
+            stmt = stmt.where(Account.updated_at >= since)
+        try:
+            return db.session.execute(stmt).all()
+        finally:
+            db.session.remove()
+
+    @classmethod
+    def _load_full(cls):
+        started = time.perf_counter()
+        rows = cls._query_rows(None)
+        entries: dict[str, DirectoryEntry] = {}
+        postings: dict[str, set[str]] = {}
+        since = None
+        for row in rows:
+            entry = DirectoryEntry(id=str(row.id), name=row.name or "", email=row.email or "", avatar=row.avatar or "")
+            entries[entry.id] = entry
+            for gram in _ngrams(entry.search_text):
+                postings.setdefault(gram, set()).add(entry.id)
+            if row.updated_at is not None and (since is None or row.updated_at > since):
+                since = row.updated_at
+        with cls._lock:
+            cls._entries, cls._postings, cls._sorted = entries, postings, None
+            cls._since = since or cls._since
+            cls._ready = True
+        logger.info(
+            "Account directory loaded %d accounts (%s ms)", len(entries),
+            round((time.perf_counter() - started) * 1000, 2),
+        )
+
+    @classmethod
+    def _load_changes(cls):
+        rows = cls._query_rows(cls._since)
+        if not rows:
+            return
+        with cls._lock:
+            for row in rows:
+                account_id = str(row.id)
+                cls._remove(account_id)
+                if row.status == AccountStatus.ACTIVE:
+                    entry = DirectoryEntry(
+                        id=account_id, name=row.name or "", email=row.email or "", avatar=row.avatar or ""
+                    )
+                    cls._entries[account_id] = entry
+                    for gram in _ngrams(entry.search_text):
+                        cls._postings.setdefault(gram, set()).add(account_id)
+                if row.updated_at is not None and (cls._since is None or row.updated_at > cls._since):
+                    cls._since = row.updated_at
+            cls._sorted = None
+
+    @classmethod
+    def _remove(cls, account_id: str):
+        entry = cls._entries.pop(account_id, None)
+        if entry is None:
+            return
+        for gram in _ngrams(entry.search_text):
+            posting = cls._postings.get(gram)
+            if posting is not None:
+                posting.discard(account_id)
+                if not posting:
+                    del cls._postings[gram]
+
+    @classmethod
+    def _sorted_entries(cls) -> list[DirectoryEntry]:
+        if cls._sorted is None:
+            cls._sorted = sorted(cls._entries.values(), key=lambda entry: entry.sort_key)
+        return cls._sorted
+
+    @classmethod
+    def _matches(cls, keyword: str) -> list[DirectoryEntry]:
+        """returns the active accounts whose name or email contains the keyword, in (name, id) order"""
+        keyword = keyword.lower()
+        with cls._lock:
+            if not keyword:
+                return cls._sorted_entries()
+            if len(keyword) < NGRAM:
+                return [entry for entry in cls._sorted_entries() if keyword in entry.search_text]
+
+            postings = []
+            for gram in _ngrams(keyword):
+                posting = cls._postings.get(gram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            matches = [
+                entry for entry in (cls._entries[account_id] for account_id in candidates)
+                if keyword in entry.search_text
+            ]
+        matches.sort(key=lambda entry: entry.sort_key)
+        return matches
+
+    @classmethod
+    def search(cls, keyword: str, offset: int, limit: int) -> tuple[int, list[DirectoryEntry]]:
+        matches = cls._matches(keyword)
+        return len(matches), matches[offset:offset + limit]
+
+    @classmethod
+    def search_after(
+        cls, keyword: str, after: Optional[tuple[str, str]], page_size: int
+    ) -> tuple[int, list[DirectoryEntry]]:
+        """returns the total number of matches and up to page_size matches sorting after `after`"""
+        matches = cls._matches(keyword)
+        if after is None:
+            return len(matches), matches[:page_size]
+        start = bisect.bisect_right(matches, after, key=lambda entry: entry.sort_key)
+        return len(matches), matches[start:start + page_size]
+
+    @classmethod
+    def get_many(cls, account_ids: list[str]) -> list[DirectoryEntry]:
+        """returns the active accounts among the given ids"""
+        with cls._lock:
+            entries = [cls._entries[account_id] for account_id in account_ids if account_id in cls._entries]
+        return entries
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            return {"ready": cls._ready, "accounts": len(cls._entries), "ngrams": len(cls._postings)}
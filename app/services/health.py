@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from flask import Flask
+from sqlalchemy import text
+
+from app.configs import config
+from app.extensions.ext_database import db
+from app.extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 决定整体健康状态的依赖，IdP 不可达不影响本服务的存活判断
+REQUIRED_CHECKS = ("database", "redis")
+
+
+@dataclass(frozen=True, slots=True)
+class CheckResult:
+    ok: bool
+    latency_ms: float
+    checked_at: float
+    # 对外只返回异常类名，完整信息可能包含主机和端口，只写入日志
+    error: str = ""
+    detail: str = ""
+
+    def to_dict(self, now: float) -> dict:
+        data = {
+            "ok": self.ok,
+            "latency_ms": self.latency_ms,
+            "age": round(now - self.checked_at, 3),
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class HealthProber:
+    """
+    Per-worker background prober for the service's dependencies.
+
+    Every `HEALTH_CHECK_INTERVAL` seconds the database, Redis and the IdP discovery
+    endpoint are probed concurrently, each bounded by `HEALTH_CHECK_TIMEOUT`. A check
+    that is still hanging from an earlier round is reported as timed out instead of
+    being started again, so a stuck backend never piles up probe threads or pool
+    connections. `/health?detail` only reads the latest results.
+    """
+
+    _results: dict[str, CheckResult] = {}
+    _inflight: dict[str, Future] = {}
+    _app: Optional[Flask] = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _prober: Optional[threading.Thread] = None
+
+    @classmethod
+    def start(cls, app: Flask):
+        cls._app = app
+        if cls._prober is not None and cls._prober.is_alive():
+            return
+        cls._executor = ThreadPoolExecutor(max_workers=len(cls._checks()), thread_name_prefix="health-check")
+        cls._prober = threading.Thread(target=cls._run, name="health-prober", daemon=True)
+        cls._prober.start()
+
+    @classmethod
+    def after_fork(cls):
+        cls._results = {}
+        cls._inflight = {}
+        cls._executor = None
+        cls._prober = None
+
+    @classmethod
+    def _checks(cls) -> dict[str, Callable[[], None]]:
+        return {
+            "database": cls._check_database,
+            "redis": cls._check_redis,
+            "idp": cls._check_idp,
+        }
+
+    @classmethod
+    def _run(cls):
+        while True:
+            try:
+                cls.probe()
+            except Exception as e:
+                logger.warning("Health probe failed: %s", str(e))
+            time.sleep(config.HEALTH_CHECK_INTERVAL)
+
+    @classmethod
+    def probe(cls):
+        """runs one round of checks and stores the results"""
+        started = time.perf_counter()
+        futures = {}
+        for name, check in cls._checks().items():
+            future = cls._inflight.get(name)
+            if future is None or future.done():
+                future = cls._executor.submit(cls._timed, check)
+                cls._inflight[name] = future
+            futures[name] = future
+
+        deadline = started + config.HEALTH_CHECK_TIMEOUT
+        for name, future in futures.items():
+            try:
+                result = future.result(timeout=max(deadline - time.perf_counter(), 0))
+            except FutureTimeoutError:
+                result = CheckResult(
+                    ok=False,
+                    latency_ms=round((time.perf_counter() - started) * 1000, 2),
+                    checked_at=time.time(),
+                    error="timeout",
+                )
+            previous = cls._results.get(name)
+            if (previous is None and not result.ok) or (previous is not None and previous.ok != result.ok):
+                logger.warning(
+                    "Health check %s changed to %s: %s", name, "ok" if result.ok else "failed",
+                    result.detail or result.error,
+                )
+            cls._results[name] = result
+
+    @staticmethod
+    def _timed(check: Callable[[], None]) -> CheckResult:
+        start = time.perf_counter()
+        try:
+            check()
+            error = detail = ""
+        except Exception as e:
+            error = type(e).__name__
+            detail = str(e) or error
+        return CheckResult(
+            ok=not error,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2),
+            checked_at=time.time(),
+            error=error,
+            detail=detail,
+        )
+
+    @classmethod
+    def _check_database(cls):
+        with cls._app.app_context():
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+    @staticmethod
+    def _check_redis():
+        redis_client.ping()
+
+    @staticmethod
+    def _check_idp():
+        from app.extensions.ext_oidc import oidc_service
+
+        timeout = min(config.HEALTH_CHECK_TIMEOUT, config.OIDC_HTTP_CONNECT_TIMEOUT), config.HEALTH_CHECK_TIMEOUT
+        response = oidc_service.session.get(oidc_service.discovery_url, timeout=timeout)
+        if response.status_code >= 500:
+            raise Exception(f"IdP returned status {response.status_code}")
+
+    @classmethod
+    def report(cls) -> tuple[bool, dict]:
+        """returns the overall status and the cached result of every check, with its age"""
+        now = time.time()
+        # 后台线程停止或长时间卡住时，旧结果不再可信
+        max_age = config.HEALTH_CHECK_INTERVAL * 3 + config.HEALTH_CHECK_TIMEOUT
+        checks = {}
+        for name in cls._checks():
+            result = cls._results.get(name)
+            if result is None:
+                checks[name] = {"ok": False, "error": "not checked yet"}
+            elif now - result.checked_at > max_age:
+                checks[name] = {**result.to_dict(now), "ok": False, "error": "stale"}
+            else:
+                checks[name] = result.to_dict(now)
+        healthy = all(checks[name]["ok"] for name in REQUIRED_CHECKS)
+        return healthy, checks
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from flask import Flask
+from sqlalchemy import text
+
+from app.configs import config
+from app.extensions.ext_database import db
+
+logger = logging.getLogger(__name__)
+
+
+class LoginInfoWriter:
+    """
+    Write-behind queue for `accounts.last_login_at` / `last_login_ip`.
+
+    Logins only record the latest (time, ip) per account in a bounded in-process map; a
+    background thread flushes it every `LOGIN_INFO_FLUSH_INTERVAL` seconds with one
+    multi-row UPDATE that skips rows already holding the same values. Losing a few
+    seconds of last-login data on a crash is acceptable, so the map is not persisted.
+    """
+
+    _pending: dict[str, tuple[datetime, Optional[str]]] = {}
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _app: Optional[Flask] = None
+    _flusher: Optional[threading.Thread] = None
+    dropped = 0
+
+    @classmethod
+    def record(cls, account_id: str, login_at: datetime, login_ip: Optional[str]):
+        if cls._flusher is None:
+            # 未启动后台线程（如命令行环境）时直接写入
+            cls._write({account_id: (login_at, login_ip)})
+            return
+        with cls._lock:
+            if account_id not in cls._pending and len(cls._pending) >= config.LOGIN_INFO_QUEUE_SIZE:
+                cls.dropped += 1
+                cls._wakeup.set()
+                return
+            cls._pending[account_id] = (login_at, login_ip)
+            if len(cls._pending) >= config.LOGIN_INFO_QUEUE_SIZE:
+                cls._wakeup.set()
+
+    @classmethod
+    def start(cls, app: Flask):
+        if not config.LOGIN_INFO_FLUSH_INTERVAL:
+            return
+        cls._app = app
+        if cls._flusher is not None and cls._flusher.is_alive():
+            return
+        cls._flusher = threading.Thread(target=cls._run, name="login-info-writer", daemon=True)
+        cls._flusher.start()
+        atexit.register(cls.flush)
+
+    @classmethod
+    def after_fork(cls):
+        cls._pending = {}
+        cls._lock = threading.Lock()
+        cls._wakeup = threading.Event()
+        cls._flusher = None
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._wakeup.wait(config.LOGIN_INFO_FLUSH_INTERVAL)
+            cls._wakeup.clear()
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+        if not pending:
+            return
+        try:
+            if cls._app is not None:
+                with cls._app.app_context():
+                    cls._write(pending)
+            else:
+                cls._write(pending)
+        except Exception as e:
+            logger.warning("Failed to flush login info of %d accounts: %s", len(pending), str(e))
+
+    @staticmethod
+    def _write(pending: dict[str, tuple[datetime, Optional[str]]]):
+        items = list(pending.items())
+        for start in range(0, len(items), config.LOGIN_INFO_BATCH_SIZE):
+            batch = items[start:start + config.LOGIN_INFO_BATCH_SIZE]
+            rows = []
+            params = {}
+            for i, (account_id, (login_at, login_ip)) in enumerate(batch):
+                rows.append(f"(CAST(:id_{i} AS uuid), CAST(:at_{i} AS timestamp), CAST(:ip_{i} AS varchar))")
+                params[f"id_{i}"] = account_id
+                params[f"at_{i}"] = login_at
+                params[f"ip_{i}"] = login_ip
+            db.session.execute(
+                text(
+                    "UPDATE accounts AS a SET last_login_at = v.login_at, last_login_ip = v.login_ip "
+                    f"FROM (VALUES {', '.join(rows)}) AS v(id, login_at, login_ip) "
+                    "WHERE a.id = v.id "
+                    "AND (a.last_login_at IS DISTINCT FROM v.login_at OR a.last_login_ip IS DISTINCT FROM v.login_ip)"
+                ),
+                params,
+            )
+        db.session.commit()
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            return {"pending": len(cls._pending), "maxsize": config.LOGIN_INFO_QUEUE_SIZE, "dropped": cls.dropped}
@@ -1,18 +1,25 @@
 import logging
 from datetime import timedelta
+from http.cookiejar import DefaultCookiePolicy
 from typing import Dict
 from urllib.parse import urlencode, unquote
 
+import jwt
 import requests
+from requests.adapters import HTTPAdapter
 
 from app.configs import config
-from app.extensions.ext_database import db
-from app.extensions.ext_redis import redis_client
 from app.libs.helper import naive_utc_now
-from app.models.account import Account, AccountStatus, TenantAccountJoin, TenantAccountRole
-from app.models.model import Site
+from app.libs import request_timing
+from app.libs.metrics import IDP_LATENCY, track
+from app.models.account import Account, TenantAccountRole
+from app.services.account import AccountService
+from app.services.login_info import LoginInfoWriter
+from app.services.oidc_discovery import JWKSCache, OIDCDiscovery
 from app.services.passport import PassportService
+from app.services.site import SiteService
 from app.services.token import TokenService
+from app.services.webapp_access import WebAppAccessService
 
 logger = logging.getLogger(__name__)
 
@@ -29,26 +36,45 @@ class OIDCService:
         self.account_default_role = config.ACCOUNT_DEFAULT_ROLE
         self.passport_service = PassportService()
         self.token_service = TokenService()
-
-        # 获取OIDC配置
-        self._load_oidc_config()
-
-    def _load_oidc_config(self):
-        """加载OIDC配置"""
-        response = requests.get(self.discovery_url)
-        if response.status_code == 200:
-            oidc_config = response.json()
-            self.authorization_endpoint = oidc_config.get('authorization_endpoint')
-            self.token_endpoint = oidc_config.get('token_endpoint')
-            self.userinfo_endpoint = oidc_config.get('userinfo_endpoint')
-            logger.debug("OIDC配置加载成功: %s", oidc_config)
-        else:
-            logger.error("OIDC配置加载失败: %s", response.text)
-            raise Exception("Failed to load OIDC configuration")
+        self.timeout = (config.OIDC_HTTP_CONNECT_TIMEOUT, config.OIDC_HTTP_READ_TIMEOUT)
+        self.session = self._create_session()
+
+        # OIDC配置在首次使用时才加载
+        self.discovery = OIDCDiscovery(self.discovery_url, self.session, self.timeout)
+        self.jwks = JWKSCache(self.discovery, self.session, self.timeout)
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """creates the keep-alive connection pool shared by all IdP calls"""
+        session = requests.Session()
+        # 会话被所有并发请求共用，不保存 IdP 返回的 cookie，避免带到其他用户的请求中
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_maxsize=config.OIDC_HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def after_fork(self):
+        """replaces the connection pool, whose sockets are shared with the parent after fork"""
+        self.session = self._create_session()
+        self.discovery.after_fork(self.session)
+        self.jwks.after_fork(self.session)
+
+    @property
+    def authorization_endpoint(self) -> str:
+        return self.discovery.get().get('authorization_endpoint')
+
+    @property
+    def token_endpoint(self) -> str:
+        return self.discovery.get().get('token_endpoint')
+
+    @property
+    def userinfo_endpoint(self) -> str:
+        return self.discovery.get().get('userinfo_endpoint')
 
     def check_oidc_config(self) -> bool:
-        """checks if the OIDC configuration is complete"""
-        if not self.authorization_endpoint or not self.token_endpoint or not self.userinfo_endpoint:
+        """checks if the OIDC configuration is complete, without waiting for the IdP"""
+        if not self.client_id or not self.discovery_url or not self.redirect_uri:
             return False
         return True
 
@@ -81,22 +107,79 @@ class OIDCService:
         if redirect_uri_params:
             data['redirect_uri'] = self.redirect_uri + "?" + unquote(redirect_uri_params)
 
-        response = requests.post(self.token_endpoint, data=data)
-        if response.status_code != 200:
-            logger.exception("获取token失败: status_code=%d, response=%s",
-                             response.status_code, response.text)
-            raise Exception("Failed to get token")
-        return response.json()
+        with track(IDP_LATENCY, endpoint="token"), request_timing.span("idp", "token"):
+            response = self.session.post(self.token_endpoint, data=data, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.exception("获取token失败: status_code=%d, response=%s",
+                                 response.status_code, response.text)
+                raise Exception("Failed to get token")
+            return response.json()
 
     def get_user_info(self, access_token: str) -> Dict:
         # 获取用户信息
         headers = {'Authorization': f'Bearer {access_token}'}
-        response = requests.get(self.userinfo_endpoint, headers=headers)
-        if response.status_code != 200:
-            logger.exception("获取用户信息失败: status_code=%d, response=%s",
-                             response.status_code, response.text)
-            raise Exception("Failed to get user info")
-        return response.json()
+        with track(IDP_LATENCY, endpoint="userinfo"), request_timing.span("idp", "userinfo"):
+            response = self.session.get(self.userinfo_endpoint, headers=headers, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.exception("获取用户信息失败: status_code=%d, response=%s",
+                                 response.status_code, response.text)
+                raise Exception("Failed to get user info")
+            return response.json()
+
+    def verify_id_token(self, id_token: str) -> Dict:
+        """validates the ID token locally against the IdP's JWKS and returns its claims"""
+        header = jwt.get_unverified_header(id_token)
+        algorithm = header.get('alg')
+        if algorithm not in config.OIDC_ID_TOKEN_ALGORITHMS.split(','):
+            raise jwt.exceptions.InvalidAlgorithmError(f"ID token algorithm {algorithm} is not allowed")
+        if algorithm.startswith('HS'):
+            # 对称签名的 ID token 使用 client secret 作为密钥
+            key = self.client_secret
+        else:
+            key = self.jwks.get_signing_key(header.get('kid')).key
+        with request_timing.span("jwt", "id_token"):
+            return jwt.decode(
+                id_token,
+                key,
+                algorithms=[algorithm],
+                audience=self.client_id,
+                issuer=self.discovery.get().get('issuer'),
+                leeway=config.OIDC_ID_TOKEN_LEEWAY,
+                options={"require": ["exp", "iat", "iss", "aud"]},
+            )
+
+    def _get_id_token_claims(self, id_token: str | None) -> Dict | None:
+        """returns the ID token claims if they can replace the userinfo call"""
+        if not config.OIDC_ID_TOKEN_CLAIMS_ENABLED or not id_token:
+            return None
+        try:
+            claims = self.verify_id_token(id_token)
+        except Exception as e:
+            logger.warning("ID token 本地验证失败，改用 userinfo: %s", str(e))
+            return None
+        required = [claim for claim in config.OIDC_ID_TOKEN_REQUIRED_CLAIMS.split(',') if claim]
+        missing = [claim for claim in required if claim not in claims]
+        if missing:
+            logger.debug("ID token 缺少 claim %s，改用 userinfo", missing)
+            return None
+        return claims
+
+    @staticmethod
+    def _get_user_groups(user_info: Dict, id_token: str | None) -> list[str]:
+        """reads the group claim from userinfo, falling back to the ID token"""
+        groups = user_info.get(config.OIDC_GROUPS_CLAIM)
+        if groups is None and id_token:
+            try:
+                # ID token 直接来自 token 端点的 TLS 响应，此处只读取 claim
+                claims = jwt.decode(id_token, options={"verify_signature": False})
+                groups = claims.get(config.OIDC_GROUPS_CLAIM)
+            except jwt.exceptions.PyJWTError as e:
+                logger.warning("解析 ID token 失败: %s", str(e))
+        if not groups:
+            return []
+        if isinstance(groups, str):
+            groups = groups.replace(",", " ").split()
+        return sorted({str(group) for group in groups if group})
 
     def bind_account(self, code: str, client_host: str, redirect_uri_params: str = "") -> Account:
         """binds a user to the system"""
@@ -105,11 +188,14 @@ class OIDCService:
             token_response = self.get_token(code, redirect_uri_params)
             access_token = token_response.get('access_token')
 
-            # 获取用户信息
-            user_info = self.get_user_info(access_token)
+            # 获取用户信息，ID token 中的 claim 足够时跳过 userinfo 请求
+            user_info = self._get_id_token_claims(token_response.get('id_token'))
+            if user_info is None:
+                user_info = self.get_user_info(access_token)
             user_name = user_info.get('name')
             user_email = user_info.get('email')
             user_roles = user_info.get('roles', [])
+            user_groups = self._get_user_groups(user_info, token_response.get('id_token'))
             logger.debug("用户信息: %s", user_info)
 
             # 验证必填字段
@@ -130,44 +216,29 @@ class OIDCService:
             elif TenantAccountRole.NORMAL in user_roles:
                 user_role = TenantAccountRole.NORMAL
 
-            # 查找系统用户
-            account = Account.get_by_email(user_email)
-
-            # 如果系统用户不存在，则创建系统用户
-            if not account:
-                logger.info("创建用户: %s, 角色: %s", user_email, user_role)
-                account = Account.create(
+            # 查找或创建系统用户，并确保租户关联；资料与上次登录一致时跳过数据库
+            login_at = naive_utc_now()
+            inserted = False
+            snapshot = AccountService.get_login_snapshot(user_email)
+            if snapshot is not None and snapshot.matches(user_name, user_role):
+                account = snapshot.to_account(user_email)
+            else:
+                account = Account.upsert_login(
+                    tenant_id=self.tenant_id,
                     email=user_email,
                     name=user_name,
-                    avatar="",
-                )
-                TenantAccountJoin.create(self.tenant_id, account.id, user_role)
-            else:
-                # 如果用户已存在，检查是否属于当前租户
-                tenant_account_join = TenantAccountJoin.get_by_account(
-                    self.tenant_id, account.id
+                    role=user_role,
+                    login_at=login_at,
+                    login_ip=client_host,
                 )
-                if not tenant_account_join:
-                    logger.info("用户 %s 不属于当前租户，创建关联: 角色 %s", user_email, user_role)
-                    tenant_account_join = TenantAccountJoin.create(self.tenant_id, account.id, user_role)
-                else:
-                    # 更新角色（如果有变化）
-                    if tenant_account_join.role != user_role:
-                        logger.info("用户角色更新: %s (%s -> %s)", user_email, tenant_account_join.role, user_role)
-                        tenant_account_join.role = user_role
-                        db.session.add(tenant_account_join)
-
-            # 更新用户登录信息
-            account.last_login_at = naive_utc_now()
-            account.last_login_ip = client_host
-            if account.status != AccountStatus.ACTIVE:
-                account.status = AccountStatus.ACTIVE
-            if account.name != user_name:
-                account.name = user_name
-
-            db.session.add(account)
-            db.session.commit()
-            logger.info("用户验证成功: %s, 角色: %s", user_email, user_role)
+                AccountService.set_login_snapshot(user_email, account, user_role)
+                # 新建的账号在插入时已写入登录信息
+                inserted = account.last_login_at == login_at and account.last_login_ip == client_host
+            # 登录信息异步合并写入
+            if not inserted:
+                LoginInfoWriter.record(str(account.id), login_at, client_host)
+            WebAppAccessService.set_user_groups(str(account.id), user_groups)
+            logger.info("用户验证成功: %s, 角色: %s, 组: %s", user_email, user_role, user_groups)
             return account
         except Exception as e:
             logger.exception("处理用户信息验证时发生错误: %s", str(e))
@@ -188,15 +259,14 @@ class OIDCService:
                 auth_type = "internal"
                 logger.debug("处理Web应用登录，app_code=%s", app_code)
 
-                site = db.session.query(Site).filter(Site.code == app_code).first()
-                if site:
-                    access_mode = redis_client.get(f"webapp_access_mode:{site.app_id}")
-                    if access_mode:
-                        if access_mode.decode() == "public":
-                            auth_type = "public"
-                        if access_mode.decode() == "sso_verified":
-                            auth_type = "external"
-                        logger.debug("Web应用登录类型: %s => %s", access_mode.decode(), auth_type)
+                app_id = SiteService.get_app_id_by_code(app_code)
+                if app_id:
+                    access_mode = WebAppAccessService.get_access_mode(app_id)
+                    if access_mode == "public":
+                        auth_type = "public"
+                    if access_mode == "sso_verified":
+                        auth_type = "external"
+                    logger.debug("Web应用登录类型: %s => %s", access_mode, auth_type)
 
                 # web app 登录
                 payload = {
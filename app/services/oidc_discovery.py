@@ -0,0 +1,253 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import jwt
+import requests
+
+from app.configs import config
+from app.libs import request_timing
+from app.libs.metrics import IDP_LATENCY, track
+
+logger = logging.getLogger(__name__)
+
+
+class OIDCDiscovery:
+    """
+    Lazily loads and caches the OIDC discovery document.
+
+    The document is fetched on first use and kept for the lifetime announced by the
+    IdP's Cache-Control / Expires headers. Once `OIDC_DISCOVERY_REFRESH_RATIO` of that
+    lifetime has passed, the next caller triggers a conditional refresh in a background
+    thread and keeps using the cached copy. Every successful fetch is persisted to
+    `OIDC_DISCOVERY_CACHE_FILE`, so new workers start from disk and keep serving while the
+    IdP is unreachable.
+    """
+
+    def __init__(self, url: str, session: requests.Session, timeout: tuple[float, float]):
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+        self.cache_file = config.OIDC_DISCOVERY_CACHE_FILE or os.path.join(
+            tempfile.gettempdir(), f"dify-sso-oidc-{hashlib.sha1(url.encode()).hexdigest()[:12]}.json"
+        )
+        self._document: Optional[dict] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._fetched_at = 0.0
+        self._max_age = 0.0
+        # 刷新失败后，在此时间之前不再重试
+        self._retry_at = 0.0
+        # _lock 只在读写缓存字段时短暂持有，网络请求期间不持有，读取方不会被后台刷新阻塞
+        self._lock = threading.Lock()
+        # 串行化没有缓存时的首次加载
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> dict:
+        """returns the discovery document, fetching it synchronously only if nothing is cached"""
+        document = self._document
+        if document is None:
+            with self._load_lock:
+                if self._document is None and not self._load_file():
+                    self._fetch()
+            document = self._document
+        now = time.time()
+        if now >= self._refresh_at() and now >= self._retry_at:
+            self.refresh_async()
+        return document
+
+    def prefetch(self):
+        """warms the cache without blocking the caller"""
+        if self._document is None:
+            with self._load_lock:
+                if self._document is None:
+                    self._load_file()
+        self.refresh_async()
+
+    def refresh_async(self):
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="oidc-discovery-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self._fetch()
+        except Exception as e:
+            logger.warning("OIDC discovery refresh failed, keeping the cached document: %s", str(e))
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def after_fork(self, session: requests.Session):
+        """switches to the child's own session, keeping the document loaded by the parent"""
+        self.session = session
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    def _refresh_at(self) -> float:
+        return self._fetched_at + self._max_age * config.OIDC_DISCOVERY_REFRESH_RATIO
+
+    def _fetch(self):
+        try:
+            self._fetch_once()
+        except Exception:
+            self._retry_at = time.time() + config.OIDC_DISCOVERY_RETRY_INTERVAL
+            raise
+        self._save_file()
+
+    def _fetch_once(self):
+        headers = {}
+        with self._lock:
+            has_document = self._document is not None
+            if has_document:
+                if self._etag:
+                    headers["If-None-Match"] = self._etag
+                if self._last_modified:
+                    headers["If-Modified-Since"] = self._last_modified
+
+        # 网络请求不持有 _lock，完成后再替换缓存字段
+        with track(IDP_LATENCY, endpoint="discovery"), request_timing.span("idp", "discovery"):
+            response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and has_document:
+            with self._lock:
+                self._fetched_at = time.time()
+                self._max_age = self._parse_max_age(response)
+        elif response.status_code == 200:
+            document = response.json()
+            with self._lock:
+                self._document = document
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+                self._fetched_at = time.time()
+                self._max_age = self._parse_max_age(response)
+            logger.debug("OIDC配置加载成功: %s", document)
+        else:
+            logger.error("OIDC配置加载失败: %s", response.text)
+            raise Exception("Failed to load OIDC configuration")
+
+    @staticmethod
+    def _parse_max_age(response: requests.Response) -> float:
+        max_age = None
+        cache_control = response.headers.get("Cache-Control", "")
+        for directive in cache_control.lower().split(","):
+            name, _, value = directive.strip().partition("=")
+            if name in ("no-cache", "no-store"):
+                max_age = 0
+            elif name == "max-age" and max_age is None:
+                try:
+                    max_age = int(value.strip('"'))
+                except ValueError:
+                    pass
+        if max_age is None and response.headers.get("Expires"):
+            try:
+                max_age = parsedate_to_datetime(response.headers["Expires"]).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+        if max_age is None:
+            max_age = config.OIDC_DISCOVERY_CACHE_TTL
+        return min(max(max_age, config.OIDC_DISCOVERY_MIN_TTL), config.OIDC_DISCOVERY_MAX_TTL)
+
+    def _load_file(self) -> bool:
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to read cached OIDC discovery document %s: %s", self.cache_file, str(e))
+            return False
+        if data.get("url") != self.url or not isinstance(data.get("document"), dict):
+            return False
+
+        with self._lock:
+            self._document = data["document"]
+            self._etag = data.get("etag")
+            self._last_modified = data.get("last_modified")
+            self._fetched_at = data.get("fetched_at", 0.0)
+            self._max_age = data.get("max_age", 0.0)
+        logger.debug("OIDC配置从缓存文件加载: %s", self.cache_file)
+        return True
+
+    def _save_file(self):
+        with self._lock:
+            data = {
+                "url": self.url,
+                "document": self._document,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+                "fetched_at": self._fetched_at,
+                "max_age": self._max_age,
+            }
+        try:
+            directory = os.path.dirname(self.cache_file) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".oidc-discovery-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            # 原子替换，避免其他 worker 读到写了一半的文件
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning("Failed to persist OIDC discovery document to %s: %s", self.cache_file, str(e))
+
+
+class JWKSCache:
+    """
+    Caches the IdP's signing keys from the discovery document's `jwks_uri`.
+
+    Keys are kept for `OIDC_JWKS_CACHE_TTL` seconds. A token signed with an unknown `kid`
+    forces an early refetch, rate limited to one per `OIDC_JWKS_MIN_REFRESH_INTERVAL`, so
+    key rotation is picked up without letting bogus tokens hammer the IdP.
+    """
+
+    def __init__(self, discovery: OIDCDiscovery, session: requests.Session, timeout: tuple[float, float]):
+        self.discovery = discovery
+        self.session = session
+        self.timeout = timeout
+        self._keys: dict[Optional[str], jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        now = time.time()
+        key = self._keys.get(kid)
+        if key is not None and now < self._fetched_at + config.OIDC_JWKS_CACHE_TTL:
+            return key
+
+        with self._lock:
+            key = self._keys.get(kid)
+            expired = time.time() >= self._fetched_at + config.OIDC_JWKS_CACHE_TTL
+            can_refetch = time.time() >= self._fetched_at + config.OIDC_JWKS_MIN_REFRESH_INTERVAL
+            if expired or (key is None and can_refetch):
+                self._fetch()
+                key = self._keys.get(kid)
+        if key is None:
+            raise jwt.exceptions.PyJWKClientError(f"Unable to find a signing key that matches: {kid}")
+        return key
+
+    def after_fork(self, session: requests.Session):
+        self.session = session
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        jwks_uri = self.discovery.get().get("jwks_uri")
+        if not jwks_uri:
+            raise jwt.exceptions.PyJWKClientError("The discovery document has no jwks_uri")
+        with track(IDP_LATENCY, endpoint="jwks"), request_timing.span("idp", "jwks"):
+            response = self.session.get(jwks_uri, timeout=self.timeout)
+            response.raise_for_status()
+        jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        self._keys = {key.key_id: key for key in jwk_set.keys}
+        self._fetched_at = time.time()
+        logger.debug("OIDC JWKS加载成功: %s", list(self._keys))
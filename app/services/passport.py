@@ -1,19 +1,46 @@
+import hashlib
+import time
+
 import jwt
 from werkzeug.exceptions import Unauthorized
 
 from app.configs import config
+from app.libs import request_timing
+from app.libs.cache import LRUCache
 
 
 class PassportService:
+    # 已验证的 token 在过期前直接返回缓存的 claims，key 为 token 的摘要
+    _verified_cache = LRUCache(maxsize=max(config.PASSPORT_CACHE_SIZE, 1))
+
     def __init__(self):
         self.sk = config.SECRET_KEY
 
     def issue(self, payload):
-        return jwt.encode(payload, self.sk, algorithm="HS256")
+        with request_timing.span("jwt", "issue"):
+            return jwt.encode(payload, self.sk, algorithm="HS256")
 
     def verify(self, token):
+        if not config.PASSPORT_CACHE_SIZE:
+            return self._decode(token)
+
+        digest = hashlib.sha256(token.encode() if isinstance(token, str) else token).digest()
+        claims = self._verified_cache.get(digest)
+        if claims is not None:
+            return dict(claims)
+
+        claims = self._decode(token)
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = exp - time.time()
+            if ttl > 0:
+                self._verified_cache.set(digest, dict(claims), ttl)
+        return claims
+
+    def _decode(self, token):
         try:
-            return jwt.decode(token, self.sk, algorithms=["HS256"])
+            with request_timing.span("jwt", "verify"):
+                return jwt.decode(token, self.sk, algorithms=["HS256"])
         except jwt.exceptions.ExpiredSignatureError:
             raise Unauthorized("Token has expired.")
         except jwt.exceptions.InvalidSignatureError:
@@ -22,3 +49,11 @@ class PassportService:
             raise Unauthorized("Invalid token.")
         except jwt.exceptions.PyJWTError:  # Catch-all for other JWT errors
             raise Unauthorized("Invalid token.")
+
+    @classmethod
+    def after_fork(cls):
+        cls._verified_cache.after_fork()
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        return cls._verified_cache.stats()
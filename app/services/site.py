@@ -0,0 +1,52 @@
+from typing import Optional
+
+from app.configs import config
+from app.extensions.ext_database import db
+from app.libs.cache import MISSING, LRUCache
+from app.models.model import Site
+
+
+class SiteService:
+    """Resolves webapp site codes to app ids, caching both hits and misses."""
+
+    _cache = LRUCache(maxsize=config.SITE_CODE_CACHE_SIZE, ttl=config.SITE_CODE_CACHE_TTL)
+
+    @classmethod
+    def get_app_id_by_code(cls, app_code: str) -> Optional[str]:
+        if not app_code:
+            return None
+        return cls.get_app_ids_by_codes([app_code])[app_code]
+
+    @classmethod
+    def get_app_ids_by_codes(cls, app_codes: list[str]) -> dict[str, Optional[str]]:
+        """resolves many site codes at once, querying all cache misses with a single IN query"""
+        app_ids: dict[str, Optional[str]] = {}
+        misses = []
+        for app_code in app_codes:
+            app_id = cls._cache.get(app_code, MISSING) if config.SITE_CODE_CACHE_TTL and app_code else MISSING
+            if app_id is MISSING:
+                misses.append(app_code)
+            else:
+                app_ids[app_code] = app_id
+
+        misses = [app_code for app_code in dict.fromkeys(misses) if app_code]
+        if misses:
+            rows = db.session.query(Site.code, Site.app_id).filter(Site.code.in_(misses)).all()
+            found = {row.code: row.app_id for row in rows}
+            for app_code in misses:
+                app_id = found.get(app_code)
+                app_ids[app_code] = app_id
+                if config.SITE_CODE_CACHE_TTL:
+                    cls._cache.set(app_code, app_id, None if app_id else config.SITE_CODE_NEGATIVE_CACHE_TTL)
+
+        for app_code in app_codes:
+            app_ids.setdefault(app_code, None)
+        return app_ids
+
+    @classmethod
+    def after_fork(cls):
+        cls._cache.after_fork()
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        return cls._cache.stats()
@@ -0,0 +1,115 @@
+import base64
+import json
+from typing import Optional
+
+from sqlalchemy import func, literal, text, tuple_
+
+from app.extensions.ext_database import db
+from app.models.account import Account, AccountStatus
+from app.models.types import StringUUID
+from app.services.account_directory import AccountDirectory
+
+# 由 create-subject-search-index 命令创建的 pg_trgm GIN 索引
+TRIGRAM_INDEXES = {
+    "accounts_name_trgm_idx": "CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_name_trgm_idx "
+                              "ON accounts USING gin (name gin_trgm_ops)",
+    "accounts_email_trgm_idx": "CREATE INDEX CONCURRENTLY IF NOT EXISTS accounts_email_trgm_idx "
+                               "ON accounts USING gin (email gin_trgm_ops)",
+}
+
+
+# 按码点排序，与内存目录中 Python 的字符串比较一致，两种后端签发的游标可以互换使用
+def _sort_name():
+    return Account.name.collate("C")
+
+
+def _escape_like(keyword: str) -> str:
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(account: Account) -> str:
+    """encodes the (name, id) sort key of the last returned account as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps([account.name, str(account.id)]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        name, account_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(name, str) or not isinstance(account_id, str):
+        raise ValueError("invalid cursor")
+    return name, account_id
+
+
+class SubjectSearchService:
+    """
+    Searches active accounts by name or email for the access-control dialog.
+
+    Substring matches run as ILIKE. Once `create_indexes()` has built the pg_trgm GIN
+    indexes on `accounts.name` / `accounts.email`, Postgres answers the same query from
+    them, otherwise it scans the table. Once the optional in-memory AccountDirectory is
+    loaded, searches are answered from it instead.
+    """
+
+    @staticmethod
+    def create_indexes():
+        """creates the pg_trgm extension and indexes without blocking writes to accounts"""
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for statement in TRIGRAM_INDEXES.values():
+                conn.execute(text(statement))
+
+    @classmethod
+    def _query(cls, keyword: str, *entities):
+        query = db.session.query(Account, *entities).filter(Account.status == AccountStatus.ACTIVE)
+        if keyword:
+            # 存在 gin_trgm_ops 索引时 Postgres 会自动用它执行 ILIKE '%kw%'，查询本身不变
+            pattern = f"%{_escape_like(keyword)}%"
+            query = query.filter(
+                db.or_(Account.name.ilike(pattern, escape="\\"), Account.email.ilike(pattern, escape="\\"))
+            )
+        return query.order_by(_sort_name(), Account.id)
+
+    @classmethod
+    def search(cls, keyword: str, offset: int, limit: int) -> tuple[int, list[Account]]:
+        """returns the total number of matches and up to `limit` matches from `offset`, counted in the same query"""
+        if AccountDirectory.ready():
+            return AccountDirectory.search(keyword, offset, limit)
+        rows = cls._query(keyword, func.count().over()).limit(limit).offset(offset).all()
+        if rows:
+            return rows[0][1], [row[0] for row in rows]
+        if offset == 0 and limit:
+            return 0, []
+        # 偏移超出范围或 limit 为 0 时窗口函数没有返回行，单独统计总数
+        return cls._query(keyword).order_by(None).count(), []
+
+    @classmethod
+    def search_after(
+        cls, keyword: str, cursor: Optional[str], page_size: int
+    ) -> tuple[list[Account], Optional[str], Optional[int]]:
+        """
+        returns one page after the cursor, the cursor of the next page and, for the first
+        page only, the total number of matches.
+
+        Pages are located with `(name, id) > cursor` on the sort key instead of OFFSET, so
+        every page costs the same as the first. Names compare by code point (COLLATE "C"),
+        the same order the in-memory directory uses, so a cursor issued by either backend
+        stays valid on the other.
+        """
+        if AccountDirectory.ready():
+            total, users = AccountDirectory.search_after(
+                keyword, decode_cursor(cursor) if cursor else None, page_size + 1
+            )
+            total = None if cursor else total
+        elif cursor is None:
+            total, users = cls.search(keyword, 0, page_size + 1)
+        else:
+            name, account_id = decode_cursor(cursor)
+            query = cls._query(keyword).filter(
+                tuple_(_sort_name(), Account.id) > tuple_(literal(name), literal(account_id, StringUUID))
+            )
+            total, users = None, query.limit(page_size + 1).all()
+
+        next_cursor = encode_cursor(users[page_size - 1]) if len(users) > page_size else None
+        return users[:page_size], next_cursor, total
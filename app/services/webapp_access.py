@@ -0,0 +1,545 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Optional
+
+from redis.exceptions import WatchError
+
+from app.configs import config
+from app.extensions.ext_redis import redis_client
+from app.libs.cache import LRUCache
+from app.libs.metrics import ACCESS_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+VISITOR = "visitor"
+
+ACCESS_MODE_PUBLIC = "public"
+# 只要求登录即可访问的模式
+LOGIN_ACCESS_MODES = frozenset({"private_all", "sso_verified"})
+
+LEGACY_KEY_PREFIX = "webapp_access_mode:"
+
+
+# 旧版存储：模式和逗号拼接的成员列表分别存放在字符串 key 中
+def legacy_access_mode_key(app_id: str) -> str:
+    return f"webapp_access_mode:{app_id}"
+
+
+def legacy_accounts_key(app_id: str) -> str:
+    return f"webapp_access_mode:accounts:{app_id}"
+
+
+def legacy_groups_key(app_id: str) -> str:
+    return f"webapp_access_mode:groups:{app_id}"
+
+
+# 新版存储：模式存放在 hash 中，成员存放在 set 中。
+# 使用 {app_id} 作为 hash tag，保证同一应用的 key 在集群中位于同一个 slot
+def policy_key(app_id: str) -> str:
+    return f"webapp_access_policy:{{{app_id}}}"
+
+
+def policy_accounts_key(app_id: str) -> str:
+    return f"webapp_access_policy:{{{app_id}}}:accounts"
+
+
+def policy_groups_key(app_id: str) -> str:
+    return f"webapp_access_policy:{{{app_id}}}:groups"
+
+
+# 变更记录：全局版本号和最后修改时间，以及每个应用最后一次修改时的全局版本号和时间。
+# 这些 key 共用 {changes} hash tag，以便在集群中由同一个 Lua 脚本原子更新
+CHANGES_VERSION_KEY = "webapp_access_policy:{changes}:version"
+CHANGES_META_KEY = "webapp_access_policy:{changes}:meta"
+CHANGES_LOG_KEY = "webapp_access_policy:{changes}:log"
+CHANGES_APP_TIME_KEY = "webapp_access_policy:{changes}:app_updated_at"
+
+_RECORD_CHANGE_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('HSET', KEYS[2], 'version', version, 'updated_at', ARGV[2])
+redis.call('ZADD', KEYS[3], version, ARGV[1])
+redis.call('HSET', KEYS[4], ARGV[1], ARGV[2])
+return version
+"""
+
+
+# 用户登录时从 IdP 获取的所属组
+def user_groups_key(user_id: str) -> str:
+    return f"webapp_user_groups:{user_id}"
+
+
+# 所有登录用户出现过的组，用于在控制台搜索组
+KNOWN_GROUPS_KEY = "webapp_groups"
+
+
+@dataclass(frozen=True, slots=True)
+class AccessPolicy:
+    """
+    The compiled access decision of one app.
+
+    `accounts` is None when the member set is too large to keep in process, in which
+    case membership is answered by SISMEMBER against Redis. `groups` is always kept in
+    process; a user is granted access if any of their groups is in it.
+    """
+
+    mode: str
+    accounts: Optional[frozenset[str]] = frozenset()
+    groups: frozenset[str] = frozenset()
+    app_id: str = ""
+
+    def allows(self, user_id: str, require_login: bool = False) -> bool:
+        if self.mode == ACCESS_MODE_PUBLIC:
+            return True
+        if self.mode in LOGIN_ACCESS_MODES and not (require_login and user_id == VISITOR):
+            return True
+        return self.has_account(user_id)
+
+    def has_account(self, user_id: str) -> bool:
+        if self.accounts is not None:
+            return user_id in self.accounts
+        return bool(redis_client.sismember(policy_accounts_key(self.app_id), user_id))
+
+    def has_group(self, user_groups: frozenset[str]) -> bool:
+        # 只遍历较小的一方，开销与组的成员数无关
+        return not self.groups.isdisjoint(user_groups)
+
+    @property
+    def needs_membership(self) -> bool:
+        return self.mode != ACCESS_MODE_PUBLIC and self.mode not in LOGIN_ACCESS_MODES
+
+
+PUBLIC_POLICY = AccessPolicy(mode=ACCESS_MODE_PUBLIC)
+
+
+def _split_members(value: Optional[bytes]) -> frozenset[str]:
+    if not value:
+        return frozenset()
+    return frozenset(member for member in value.decode().split(",") if member)
+
+
+def _decode_members(members) -> frozenset[str]:
+    return frozenset(member.decode() if isinstance(member, bytes) else member for member in members)
+
+
+class WebAppAccessService:
+    """
+    Reads and writes webapp access policies.
+
+    Compiled policies are kept in a per-worker cache, so steady-state permission checks
+    never touch Redis. Every write publishes the app id on `WEBAPP_ACCESS_POLICY_CHANNEL`
+    and each worker's listener drops the matching entry.
+    """
+
+    _cache = LRUCache(
+        maxsize=config.WEBAPP_ACCESS_POLICY_CACHE_SIZE,
+        ttl=config.WEBAPP_ACCESS_POLICY_CACHE_TTL or None,
+    )
+    # 每次失效都会递增，用于丢弃失效期间并发加载到的旧策略
+    _generation = 0
+    _listener: Optional[threading.Thread] = None
+    _listener_lock = threading.Lock()
+
+    @classmethod
+    def get_policy(cls, app_id: str) -> AccessPolicy:
+        if not app_id:
+            return PUBLIC_POLICY
+        return cls.get_policies([app_id])[app_id]
+
+    @classmethod
+    def get_policies(cls, app_ids: list[str]) -> dict[str, AccessPolicy]:
+        """returns the policies of many apps, loading all cache misses in one Redis round trip"""
+        policies: dict[str, AccessPolicy] = {}
+        misses = []
+        for app_id in app_ids:
+            if not app_id:
+                policies[app_id] = PUBLIC_POLICY
+                continue
+            policy = cls._cache.get(app_id) if config.WEBAPP_ACCESS_POLICY_CACHE_ENABLED else None
+            if policy is None:
+                misses.append(app_id)
+            else:
+                policies[app_id] = policy
+
+        if misses:
+            generation = cls._generation
+            loaded = cls._load_policies(list(dict.fromkeys(misses)))
+            if config.WEBAPP_ACCESS_POLICY_CACHE_ENABLED and generation == cls._generation:
+                for app_id, policy in loaded.items():
+                    cls._cache.set(app_id, policy)
+            policies.update(loaded)
+        return policies
+
+    @classmethod
+    def get_access_mode(cls, app_id: str) -> str:
+        return cls.get_policy(app_id).mode or ACCESS_MODE_PUBLIC
+
+    @classmethod
+    def get_access_modes(cls, app_ids: list[str]) -> dict[str, str]:
+        policies = cls.get_policies(app_ids)
+        return {app_id: policies[app_id].mode or ACCESS_MODE_PUBLIC for app_id in app_ids}
+
+    @classmethod
+    def check_permission(cls, app_id: str, user_id: str, require_login: bool = False) -> bool:
+        policy = cls.get_policy(app_id)
+        if policy.allows(user_id, require_login):
+            result = True
+        elif policy.groups and user_id and user_id != VISITOR:
+            result = policy.has_group(cls.get_user_groups(user_id))
+        else:
+            result = False
+        ACCESS_DECISIONS.labels(mode=policy.mode, result="granted" if result else "denied").inc()
+        return result
+
+    @classmethod
+    def check_permissions(cls, app_ids: list[str], user_id: str) -> dict[str, bool]:
+        """evaluates many apps for one user, sending the remaining Redis lookups in one pipeline"""
+        policies = cls.get_policies(app_ids)
+        results: dict[str, bool] = {}
+        remote = []
+        by_group = []
+        for app_id, policy in policies.items():
+            if not policy.needs_membership:
+                results[app_id] = True
+                continue
+            if policy.accounts is None:
+                remote.append(app_id)
+            else:
+                results[app_id] = policy.has_account(user_id)
+            if policy.groups and user_id and user_id != VISITOR:
+                by_group.append(app_id)
+
+        if remote or by_group:
+            pipe = redis_client.pipeline()
+            for app_id in remote:
+                pipe.sismember(policy_accounts_key(app_id), user_id)
+            if by_group:
+                pipe.smembers(user_groups_key(user_id))
+            values = pipe.execute()
+            for app_id, is_member in zip(remote, values):
+                results[app_id] = bool(is_member)
+            if by_group:
+                user_groups = _decode_members(values[-1])
+                for app_id in by_group:
+                    results[app_id] = results[app_id] or policies[app_id].has_group(user_groups)
+        for app_id, result in results.items():
+            ACCESS_DECISIONS.labels(mode=policies[app_id].mode, result="granted" if result else "denied").inc()
+        return results
+
+    @staticmethod
+    def get_user_groups(user_id: str) -> frozenset[str]:
+        return _decode_members(redis_client.smembers(user_groups_key(user_id)))
+
+    @staticmethod
+    def set_user_groups(user_id: str, groups: list[str]):
+        """records the groups the IdP reported for the user at login"""
+        pipe = redis_client.pipeline()
+        pipe.delete(user_groups_key(user_id))
+        if groups:
+            pipe.sadd(user_groups_key(user_id), *groups)
+            if config.WEBAPP_USER_GROUPS_TTL:
+                pipe.expire(user_groups_key(user_id), config.WEBAPP_USER_GROUPS_TTL)
+            pipe.sadd(KNOWN_GROUPS_KEY, *groups)
+        pipe.execute()
+
+    @staticmethod
+    def search_groups(keyword: str) -> list[str]:
+        """returns the known group names containing the keyword, sorted"""
+        keyword = keyword.lower()
+        groups = sorted(_decode_members(redis_client.smembers(KNOWN_GROUPS_KEY)))
+        return [group for group in groups if keyword in group.lower()]
+
+    @staticmethod
+    def iter_account_batches(app_id: str, batch_size: int):
+        """yields the allowed account ids in batches, without loading the whole member set"""
+        if redis_client.exists(policy_key(app_id)):
+            batch = []
+            for member in redis_client.sscan_iter(policy_accounts_key(app_id), count=batch_size):
+                batch.append(member.decode() if isinstance(member, bytes) else member)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            return
+        # 旧版数据只能整体读取
+        accounts = sorted(_split_members(redis_client.get(legacy_accounts_key(app_id))))
+        for start in range(0, len(accounts), batch_size):
+            yield accounts[start:start + batch_size]
+
+    @classmethod
+    def get_groups(cls, app_id: str) -> list[str]:
+        """returns the groups allowed to access the app"""
+        return cls._get_subjects(app_id, policy_groups_key(app_id), legacy_groups_key(app_id))
+
+    @staticmethod
+    def _get_subjects(app_id: str, key: str, legacy_key: str) -> list[str]:
+        pipe = redis_client.pipeline()
+        pipe.exists(policy_key(app_id))
+        pipe.smembers(key)
+        pipe.get(legacy_key)
+        exists, members, legacy_members = pipe.execute()
+        if exists:
+            return sorted(_decode_members(members))
+        return sorted(_split_members(legacy_members))
+
+    @staticmethod
+    def _load_policies(app_ids: list[str]) -> dict[str, AccessPolicy]:
+        # 第一轮：读取模式和成员数量；旧版 key 仅在新版 hash 不存在时才会被使用
+        pipe = redis_client.pipeline()
+        for app_id in app_ids:
+            pipe.hget(policy_key(app_id), "mode")
+            pipe.scard(policy_accounts_key(app_id))
+            pipe.smembers(policy_groups_key(app_id))
+            pipe.get(legacy_access_mode_key(app_id))
+        values = pipe.execute()
+
+        policies: dict[str, AccessPolicy] = {}
+        inline = []
+        legacy = []
+        for i, app_id in enumerate(app_ids):
+            mode_value, member_count, groups, legacy_mode_value = values[4 * i: 4 * i + 4]
+            if mode_value is not None:
+                policy = AccessPolicy(
+                    mode=mode_value.decode(),
+                    accounts=None,
+                    groups=_decode_members(groups),
+                    app_id=app_id,
+                )
+                if policy.mode == ACCESS_MODE_PUBLIC:
+                    policies[app_id] = PUBLIC_POLICY
+                elif member_count <= config.WEBAPP_ACCESS_POLICY_INLINE_MEMBERS:
+                    inline.append(policy)
+                else:
+                    policies[app_id] = policy
+            elif legacy_mode_value is not None and legacy_mode_value.decode() != ACCESS_MODE_PUBLIC:
+                legacy.append((app_id, legacy_mode_value.decode()))
+            else:
+                policies[app_id] = PUBLIC_POLICY
+
+        if not inline and not legacy:
+            return policies
+
+        # 第二轮：拉取成员较少的 set，以及尚未迁移的旧版成员列表
+        pipe = redis_client.pipeline()
+        for policy in inline:
+            pipe.smembers(policy_accounts_key(policy.app_id))
+        for app_id, _ in legacy:
+            pipe.get(legacy_accounts_key(app_id))
+            pipe.get(legacy_groups_key(app_id))
+        values = pipe.execute()
+
+        for policy, members in zip(inline, values):
+            policies[policy.app_id] = AccessPolicy(
+                mode=policy.mode,
+                accounts=_decode_members(members),
+                groups=policy.groups,
+                app_id=policy.app_id,
+            )
+        legacy_values = values[len(inline):]
+        for i, (app_id, mode) in enumerate(legacy):
+            policies[app_id] = AccessPolicy(
+                mode=mode,
+                accounts=_split_members(legacy_values[2 * i]),
+                groups=_split_members(legacy_values[2 * i + 1]),
+                app_id=app_id,
+            )
+        return policies
+
+    @classmethod
+    def set_access_mode(cls, app_id: str, access_mode: str, accounts: list[str], groups: list[str]):
+        pipe = redis_client.pipeline()
+        cls._write_policy(pipe, app_id, access_mode, accounts, groups)
+        pipe.execute()
+        # 新版数据写入后，旧版 key 不再有意义
+        redis_client.delete(legacy_access_mode_key(app_id))
+        redis_client.delete(legacy_groups_key(app_id))
+        redis_client.delete(legacy_accounts_key(app_id))
+        cls.record_change(app_id)
+        cls.publish_invalidation(app_id)
+
+    @staticmethod
+    def _write_policy(pipe, app_id: str, access_mode: str, accounts: list[str], groups: list[str]):
+        pipe.hset(policy_key(app_id), "mode", access_mode)
+        pipe.delete(policy_accounts_key(app_id))
+        if accounts:
+            pipe.sadd(policy_accounts_key(app_id), *accounts)
+        pipe.delete(policy_groups_key(app_id))
+        if groups:
+            pipe.sadd(policy_groups_key(app_id), *groups)
+
+    @classmethod
+    def clean_access_mode(cls, app_id: str):
+        redis_client.delete(policy_key(app_id), policy_accounts_key(app_id), policy_groups_key(app_id))
+        redis_client.delete(legacy_access_mode_key(app_id))
+        redis_client.delete(legacy_groups_key(app_id))
+        redis_client.delete(legacy_accounts_key(app_id))
+        cls.record_change(app_id)
+        cls.publish_invalidation(app_id)
+
+    @staticmethod
+    def record_change(app_id: str) -> int:
+        """bumps the global version and records it as the app's last change, returns the new version"""
+        updated_at = datetime.now(UTC).isoformat(timespec="seconds")
+        version = redis_client.eval(
+            _RECORD_CHANGE_SCRIPT,
+            4,
+            CHANGES_VERSION_KEY,
+            CHANGES_META_KEY,
+            CHANGES_LOG_KEY,
+            CHANGES_APP_TIME_KEY,
+            app_id,
+            updated_at,
+        )
+        return int(version)
+
+    @staticmethod
+    def get_last_change() -> tuple[int, Optional[str]]:
+        """returns the global version and the time of the last change"""
+        version, updated_at = redis_client.hmget(CHANGES_META_KEY, "version", "updated_at")
+        return int(version or 0), updated_at.decode() if updated_at else None
+
+    @staticmethod
+    def get_app_last_change(app_id: str) -> tuple[int, Optional[str]]:
+        """returns the global version and the time of the app's last change"""
+        pipe = redis_client.pipeline()
+        pipe.zscore(CHANGES_LOG_KEY, app_id)
+        pipe.hget(CHANGES_APP_TIME_KEY, app_id)
+        version, updated_at = pipe.execute()
+        return int(version or 0), updated_at.decode() if updated_at else None
+
+    @staticmethod
+    def get_changes_since(version: int, limit: int) -> tuple[int, list[tuple[str, int]]]:
+        """
+        returns the current global version and up to `limit` (app_id, version) pairs changed
+        after `version`, oldest first. Only each app's latest change is kept.
+        """
+        pipe = redis_client.pipeline()
+        pipe.hget(CHANGES_META_KEY, "version")
+        pipe.zrangebyscore(CHANGES_LOG_KEY, f"({version}", "+inf", start=0, num=limit, withscores=True)
+        current, changes = pipe.execute()
+        return int(current or 0), [(app_id.decode(), int(score)) for app_id, score in changes]
+
+    @classmethod
+    def migrate_legacy_policy(cls, app_id: str, keep_legacy: bool = False) -> bool:
+        """
+        converts one app's legacy string keys to the hash + set layout.
+
+        Returns False if there is nothing to convert, e.g. the app was already written in the
+        new layout after the upgrade, in which case its legacy keys are stale.
+        """
+        legacy_keys = [legacy_access_mode_key(app_id), legacy_accounts_key(app_id), legacy_groups_key(app_id)]
+
+        def read_legacy(client) -> Optional[tuple[str, list[str], list[str]]]:
+            if client.exists(policy_key(app_id)):
+                return None
+            access_mode, accounts_value, groups_value = (client.get(key) for key in legacy_keys)
+            if access_mode is None:
+                return None
+            return access_mode.decode(), sorted(_split_members(accounts_value)), sorted(_split_members(groups_value))
+
+        def migrate(pipe) -> bool:
+            legacy = read_legacy(pipe)
+            if legacy is None:
+                return False
+            pipe.multi()
+            cls._write_policy(pipe, app_id, *legacy)
+            return True
+
+        if config.REDIS_USE_CLUSTERS:
+            # 集群模式下无法跨 slot WATCH，退化为先检查后写入
+            legacy = read_legacy(redis_client)
+            migrated = legacy is not None
+            if migrated:
+                pipe = redis_client.pipeline()
+                cls._write_policy(pipe, app_id, *legacy)
+                pipe.execute()
+        else:
+            try:
+                migrated = redis_client.transaction(migrate, policy_key(app_id), value_from_callable=True)
+            except WatchError:
+                # 迁移期间该应用被重新设置，新数据已经是新版格式
+                migrated = False
+
+        if not keep_legacy:
+            for key in legacy_keys:
+                redis_client.delete(key)
+        cls.publish_invalidation(app_id)
+        return migrated
+
+    @staticmethod
+    def iter_legacy_app_ids():
+        """yields the app ids that still have a legacy access mode key"""
+        for key in redis_client.scan_iter(match=f"{LEGACY_KEY_PREFIX}*", count=500):
+            app_id = key.decode()[len(LEGACY_KEY_PREFIX):]
+            if app_id.startswith(("accounts:", "groups:")):
+                continue
+            yield app_id
+
+    @classmethod
+    def invalidate(cls, app_id: Optional[str] = None):
+        """drops one app's policy from the local cache, or every policy if app_id is None"""
+        cls._generation += 1
+        if app_id:
+            cls._cache.delete(app_id)
+        else:
+            cls._cache.clear()
+
+    @classmethod
+    def publish_invalidation(cls, app_id: str):
+        cls.invalidate(app_id)
+        try:
+            redis_client.publish(config.WEBAPP_ACCESS_POLICY_CHANNEL, app_id)
+        except Exception as e:
+            # 其他 worker 会在缓存 TTL 到期后自行刷新
+            logger.warning("Failed to publish access policy invalidation for %s: %s", app_id, str(e))
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        return cls._cache.stats()
+
+    @classmethod
+    def start_invalidation_listener(cls):
+        if not config.WEBAPP_ACCESS_POLICY_CACHE_ENABLED:
+            return
+        with cls._listener_lock:
+            if cls._listener is not None and cls._listener.is_alive():
+                return
+            cls._listener = threading.Thread(
+                target=cls._listen, name="webapp-access-invalidation", daemon=True
+            )
+            cls._listener.start()
+
+    @classmethod
+    def after_fork(cls):
+        """forgets the parent's policies and listener; the child subscribes on its own"""
+        cls._generation += 1
+        cls._cache.after_fork()
+        cls._listener = None
+        cls._listener_lock = threading.Lock()
+
+    @classmethod
+    def _listen(cls):
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub()
+                pubsub.subscribe(config.WEBAPP_ACCESS_POLICY_CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # 断线期间可能错过了失效消息，(重新)订阅后清空本地缓存
+                        cls.invalidate()
+                    elif message["type"] == "message":
+                        cls.invalidate(message["data"].decode() or None)
+            except Exception as e:
+                logger.warning("Access policy invalidation listener failed, reconnecting: %s", str(e))
+                cls.invalidate()
+                time.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
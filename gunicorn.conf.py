@@ -0,0 +1,93 @@
+import gc
+import os
+import shutil
+
+# 默认使用线程 worker：等待 IdP、数据库和 Redis 响应时同一进程可以继续处理其他请求
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# 仅 gevent worker 使用：每个 worker 同时处理的连接数
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# 在 master 中加载一次应用，worker 以写时复制方式共享代码、配置和 OIDC 发现文档；
+# gevent 需要在导入其他模块前完成 monkey patch，因此默认不预加载
+preload_app = os.environ.get("GUNICORN_PRELOAD", "false" if worker_class == "gevent" else "true").lower() == "true"
+# 预加载在 on_starting 之前就会执行 create_app，指标目录必须在导入配置时准备好；
+# HUP 重新加载配置时 master 进程不变，不能清掉仍在运行的 worker 的指标文件
+_multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _multiproc_dir and not os.environ.get("PROMETHEUS_MULTIPROC_DIR_PREPARED"):
+    # 清理上次运行遗留的多进程指标文件
+    shutil.rmtree(_multiproc_dir, ignore_errors=True)
+    os.makedirs(_multiproc_dir, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR_PREPARED"] = "true"
+
+if preload_app:
+    # 线程无法跨越 fork，后台任务改由 post_worker_init 在每个 worker 中启动
+    os.environ["DEFER_BACKGROUND_TASKS"] = "true"
+
+
+def _concurrency_per_worker() -> int:
+    if worker_class == "gevent":
+        return worker_connections
+    if worker_class == "gthread":
+        return threads
+    return 1
+
+
+def when_ready(server):
+    from app.configs import config
+
+    concurrency = _concurrency_per_worker()
+    db_capacity = config.SQLALCHEMY_POOL_SIZE + config.SQLALCHEMY_MAX_OVERFLOW
+    # 请求只在访问数据库时占用连接，连接数少于并发数时只会排队而不会出错
+    if concurrency > db_capacity:
+        server.log.warning(
+            "Each worker handles %d concurrent requests but its database pool holds %d connections, "
+            "consider raising SQLALCHEMY_POOL_SIZE / SQLALCHEMY_MAX_OVERFLOW",
+            concurrency, db_capacity,
+        )
+    if concurrency > config.OIDC_HTTP_POOL_SIZE:
+        server.log.warning(
+            "Each worker handles %d concurrent requests but keeps only %d IdP connections alive, "
+            "consider raising OIDC_HTTP_POOL_SIZE",
+            concurrency, config.OIDC_HTTP_POOL_SIZE,
+        )
+
+
+def pre_fork(server, worker):
+    # 把预加载的对象移出 GC 跟踪，避免 worker 中的垃圾回收改写这些页面而破坏写时复制
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.app import reinitialize_after_fork
+        from app.main import app
+
+        reinitialize_after_fork(app)
+    if worker_class == "gevent":
+        # psycopg2 是 C 扩展，gevent 的 monkey patch 无法让其让出，需要 psycogreen 注册等待回调
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning("psycogreen is not installed, database queries will block the gevent worker")
+        else:
+            patch_psycopg()
+
+
+def post_worker_init(worker):
+    if preload_app:
+        from app.app import start_background_tasks
+        from app.main import app
+
+        start_background_tasks(app)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)